@@ -0,0 +1,50 @@
+"""Compare per-call latency of build-per-call YouTube clients with the shared client.
+
+Usage: python scripts/bench_youtube_client.py VIDEO_ID [CALLS]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from googleapiclient.discovery import build
+import playlist_transcript_saver as pts
+
+
+def time_calls(calls, get_client, video_id):
+    durations = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        youtube = get_client()
+        youtube.videos().list(part="snippet", id=video_id).execute()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def report(label, durations):
+    durations = sorted(durations)
+    mean = sum(durations) / len(durations)
+    median = durations[len(durations) // 2]
+    print(f"{label:<16} mean {mean * 1000:8.1f} ms   median {median * 1000:8.1f} ms")
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        return 1
+    video_id = sys.argv[1]
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    pts.load_config()
+    build_per_call = time_calls(
+        calls, lambda: build('youtube', 'v3', developerKey=pts.YOUTUBE_API_KEY), video_id)
+    shared = time_calls(calls, pts.get_youtube_client, video_id)
+
+    report("build per call", build_per_call)
+    report("shared client", shared)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
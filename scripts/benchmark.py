@@ -0,0 +1,297 @@
+"""Offline benchmark of the playlist, video and delivery paths.
+
+Runs the app end to end against local stand-ins: the YouTube Data API
+(mock_youtube_server.py), YouTubeTranscriptApi and the 'yt' fallback,
+the Claude Messages API (mock_claude_server.py) and an SMTP sink
+(mock_smtp_server.py). Each playlist size runs in a fresh process with
+its own data directory, and reports throughput, p50/p99 latency per
+stage and peak memory:
+
+    python scripts/benchmark.py
+    python scripts/benchmark.py --sizes 10 500 --mode videos --json results.json
+
+The generated data and the injected failures depend only on --seed, so
+two runs with the same options do the same work.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from types import ModuleType, SimpleNamespace
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, '..', 'src'))
+sys.path.insert(0, SCRIPTS_DIR)
+
+import mock_claude_server
+import mock_smtp_server
+import mock_youtube_server
+
+STAGES = ['metadata', 'transcript', 'render', 'claude', 'delivery']
+
+# Stand-in for the 'yt' command, used when the transcript API fails
+YT_SCRIPT = """#!{python}
+import random, sys
+rng = random.Random("{seed}:yt:" + sys.argv[-1])
+words = {words!r}
+for _ in range(rng.randint(60, 180)):
+    print(' '.join(rng.choice(words) for _ in range(rng.randint(6, 14))))
+"""
+
+
+def fake_transcript(seed, video_id):
+    rng = random.Random(f"{seed}:transcript:{video_id}")
+    return [
+        {'text': mock_youtube_server.words(rng, rng.randint(6, 14)), 'start': i * 4.0, 'duration': 4.0}
+        for i in range(rng.randint(60, 180))
+    ]
+
+
+class FakeTranscriptApi:
+    """Replaces YouTubeTranscriptApi with generated transcripts."""
+
+    def __init__(self, latency, failure_rate, seed):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+
+    def get_transcript(self, video_id):
+        time.sleep(self.latency)
+        if random.Random(f"{self.seed}:fail:{video_id}").random() < self.failure_rate:
+            raise Exception("Injected transcript failure")
+        return fake_transcript(self.seed, video_id)
+
+
+class StageTimer:
+    """Records the duration of every call to the functions mapped to each stage."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = {stage: [] for stage in STAGES}
+
+    def wrap(self, owner, name, stage):
+        function = getattr(owner, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter() - start
+                with self.lock:
+                    self.durations[stage].append(duration)
+
+        setattr(owner, name, timed)
+
+    def summary(self):
+        stages = {}
+        for stage, durations in self.durations.items():
+            if not durations:
+                continue
+            durations = sorted(durations)
+            stages[stage] = {
+                'count': len(durations),
+                'p50_ms': percentile(durations, 50) * 1000,
+                'p99_ms': percentile(durations, 99) * 1000,
+                'total_s': sum(durations),
+            }
+        return stages
+
+
+def percentile(sorted_values, percent):
+    # Nearest-rank percentile
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_size(args):
+    """Run one workload in this process and print its results as JSON."""
+    random.seed(args.seed)
+    work_dir = tempfile.mkdtemp(prefix='yt-bench-')
+    os.chdir(work_dir)
+
+    bin_dir = os.path.join(work_dir, 'bin')
+    os.makedirs(bin_dir)
+    yt_path = os.path.join(bin_dir, 'yt')
+    with open(yt_path, 'w') as f:
+        f.write(YT_SCRIPT.format(python=sys.executable, seed=args.seed, words=mock_youtube_server.WORDS))
+    os.chmod(yt_path, 0o755)
+    os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+
+    import playlist_transcript_saver as pts
+
+    prompt_path = os.path.join(work_dir, 'prompt.md')
+    with open(prompt_path, 'w') as f:
+        f.write("Summarize the key lessons from these videos.\n")
+    pts.YOUTUBE_API_KEY = 'benchmark'
+    pts.YOUTUBE_API_ENDPOINT = args.youtube_endpoint
+    pts.CLAUDE_API_KEY = 'benchmark'
+    pts.CLAUDE_API_URL = args.claude_url
+    pts.EMAIL_ADDRESS = 'benchmark@example.com'
+    pts.EMAIL_PASSWORD = 'benchmark'
+    pts.PROMPT_FILE_PATH = prompt_path
+    pts.SMTP_SERVER = '127.0.0.1'
+    pts.SMTP_PORT = args.smtp_port
+    pts.SMTP_PLAINTEXT = True
+    pts.TRANSCRIPT_REQUESTS_PER_SECOND = args.transcript_rps
+    pts.METADATA_MAX_AGE_HOURS = args.metadata_max_age_hours
+    # get_transcript imports the transcript API when it is called, so the stand-in replaces the module
+    transcript_api = ModuleType('youtube_transcript_api')
+    transcript_api.YouTubeTranscriptApi = FakeTranscriptApi(args.transcript_latency, args.transcript_failure_rate, args.seed)
+    sys.modules['youtube_transcript_api'] = transcript_api
+
+    timer = StageTimer()
+    for name in ['get_video_info', 'get_videos_info', 'get_playlist_info', 'get_channel_info', 'list_playlist_items']:
+        timer.wrap(pts, name, 'metadata')
+    timer.wrap(pts, 'get_transcript', 'transcript')
+    timer.wrap(pts, 'write_video_text', 'render')
+    timer.wrap(pts, 'generate_claude_response', 'claude')
+    timer.wrap(pts.EmailDelivery, 'send_smtp', 'delivery')
+
+    if args.mode == 'playlist':
+        urls = [f"https://www.youtube.com/playlist?list={mock_youtube_server.playlist_id(args.run)}"]
+    else:
+        urls = [f"https://www.youtube.com/watch?v={mock_youtube_server.video_id(i)}" for i in range(args.run)]
+    options = SimpleNamespace(output='mail', api=True, workers=args.workers, chunked=False, stream=False)
+
+    def process_all():
+        store = pts.TranscriptStore(pts.STORE_DIR, pts.SQLITE_JOURNAL_MODE)
+        # Each run starts with an empty in-memory memo, like a new invocation of the app
+        pts.metadata_cache = pts.MetadataCache()
+        pts.metadata_cache.store = store
+        try:
+            for url in urls:
+                pts.process_url(url, '', 'reader@example.com', store, options)
+            pts.email_delivery.flush()
+        finally:
+            store.close()
+
+    error = None
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if args.warm:
+            # Fill the stores and response cache first, so the measured run takes the cached path
+            process_all()
+            timer.durations = {stage: [] for stage in STAGES}
+        warm_claude_requests = pts.claude_usage.requests
+        start = time.perf_counter()
+        try:
+            process_all()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        wall_time = time.perf_counter() - start
+
+    print(json.dumps({
+        'size': args.run,
+        'mode': args.mode,
+        'seed': args.seed,
+        'warm': args.warm,
+        'wall_s': wall_time,
+        'videos_per_s': args.run / wall_time,
+        'peak_rss_mb': peak_rss_mb(),
+        'claude_requests': pts.claude_usage.requests - warm_claude_requests,
+        'stages': timer.summary(),
+        'error': error,
+    }))
+
+
+def print_result(result):
+    status = f"  FAILED: {result['error']}" if result['error'] else ''
+    print(f"\n{result['size']} videos ({result['mode']}{', warm' if result['warm'] else ''}): "
+          f"{result['wall_s']:.2f}s, {result['videos_per_s']:.1f} videos/s, "
+          f"peak RSS {result['peak_rss_mb']:.1f} MB, {result['claude_requests']} Claude requests{status}")
+    print(f"  {'stage':<12}{'calls':>8}{'p50 ms':>10}{'p99 ms':>10}{'total s':>10}")
+    for stage in STAGES:
+        if stage in result['stages']:
+            timing = result['stages'][stage]
+            print(f"  {stage:<12}{timing['count']:>8}{timing['p50_ms']:>10.1f}"
+                  f"{timing['p99_ms']:>10.1f}{timing['total_s']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app against local stand-ins of every service.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 500, 5000], help="Videos per run (default: 10 500 5000)")
+    parser.add_argument("--mode", choices=['playlist', 'videos'], default='playlist',
+                        help="Process one playlist of each size, or each video as its own URL (default: playlist)")
+    parser.add_argument("--workers", type=int, default=4, help="--workers passed to the app (default: 4)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated data and injected failures")
+    parser.add_argument("--warm", action="store_true", default=False, help="Measure a second run over warm caches")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--youtube-latency", type=float, default=0.02, help="Seconds per YouTube Data API call (default: 0.02)")
+    parser.add_argument("--youtube-failure-rate", type=float, default=0.0, help="Fraction of YouTube Data API calls that fail")
+    parser.add_argument("--transcript-latency", type=float, default=0.05, help="Seconds per transcript fetch (default: 0.05)")
+    parser.add_argument("--transcript-failure-rate", type=float, default=0.0,
+                        help="Fraction of transcript API calls that fail and fall back to 'yt'")
+    parser.add_argument("--transcript-rps", type=float, default=0.0,
+                        help="TRANSCRIPT_REQUESTS_PER_SECOND for the run (default: 0, unthrottled)")
+    parser.add_argument("--metadata-max-age-hours", type=float, default=24.0,
+                        help="METADATA_MAX_AGE_HOURS for the run; 0 revalidates every cached entry (default: 24)")
+    parser.add_argument("--claude-latency", type=float, default=0.2, help="Seconds per Claude request (default: 0.2)")
+    parser.add_argument("--claude-failure-rate", type=float, default=0.0, help="Fraction of Claude requests answered with 529")
+    parser.add_argument("--smtp-latency", type=float, default=0.01, help="Seconds per message (default: 0.01)")
+    parser.add_argument("--smtp-failure-rate", type=float, default=0.0, help="Fraction of messages answered with 451")
+    # Internal: run a single size in a child process against already running stand-ins
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--youtube-endpoint", help=argparse.SUPPRESS)
+    parser.add_argument("--claude-url", help=argparse.SUPPRESS)
+    parser.add_argument("--smtp-port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run is not None:
+        run_size(args)
+        return 0
+
+    youtube = mock_youtube_server.make_server(latency=args.youtube_latency,
+                                              failure_rate=args.youtube_failure_rate, seed=args.seed)
+    claude = mock_claude_server.make_server(latency=args.claude_latency,
+                                            failure_rate=args.claude_failure_rate, seed=args.seed)
+    smtp = mock_smtp_server.make_server(latency=args.smtp_latency,
+                                        failure_rate=args.smtp_failure_rate, seed=args.seed)
+    for server in (youtube, claude, smtp):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    child_args = [
+        '--mode', args.mode, '--workers', str(args.workers), '--seed', str(args.seed),
+        '--transcript-latency', str(args.transcript_latency),
+        '--transcript-failure-rate', str(args.transcript_failure_rate),
+        '--transcript-rps', str(args.transcript_rps),
+        '--metadata-max-age-hours', str(args.metadata_max_age_hours),
+        '--youtube-endpoint', f"http://127.0.0.1:{youtube.server_port}/",
+        '--claude-url', f"http://127.0.0.1:{claude.server_port}/v1/messages",
+        '--smtp-port', str(smtp.server_port),
+    ] + (['--warm'] if args.warm else [])
+
+    results = []
+    for size in args.sizes:
+        # A fresh process per size keeps peak memory and module state separate
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run', str(size)] + child_args,
+            capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            print(f"\n{size} videos: benchmark process failed\n{completed.stderr}")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print_result(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0 if results and not any(result['error'] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Guard the CLI's cold-start cost.
+
+Imports playlist_transcript_saver and runs load_config() in a fresh
+interpreter under `python -X importtime`, then fails if either:
+
+- a service client (Google API client, boto3, requests, markdown, the
+  transcript API or the email modules) was imported, since those belong
+  to the stage that uses them, or
+- importing the module and loading the config took longer than
+  --budget-ms, timed around both in the child process.
+
+Usage: python scripts/check_import_time.py [--budget-ms 100] [--runs 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Top-level packages that must only be imported once a stage needs them
+DEFERRED_MODULES = [
+    'boto3', 'botocore', 'googleapiclient', 'httplib2', 'markdown',
+    'requests', 'smtplib', 'email', 'youtube_transcript_api',
+]
+
+CONFIG = """YOUTUBE_API_KEY=check
+CLAUDE_API_KEY=check
+EMAIL_ADDRESS=check@example.com
+EMAIL_PASSWORD=check
+PROMPT_FILE_PATH={prompt_path}
+"""
+
+STARTUP = """import time
+start = time.perf_counter()
+import playlist_transcript_saver as pts
+pts.load_config()
+print(f"startup_us={(time.perf_counter() - start) * 1e6:.0f}")
+"""
+
+
+def measure(work_dir):
+    """Return the startup and module import times in microseconds, and every module imported."""
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(SRC_DIR))
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP],
+        cwd=work_dir, env=env, capture_output=True, text=True, check=True
+    )
+    startup_time = int(completed.stdout.rsplit('startup_us=', 1)[1])
+    module_time = None
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        name = name.strip()
+        modules.append(name)
+        if name == 'playlist_transcript_saver':
+            module_time = int(cumulative)
+    return startup_time, module_time, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the CLI.")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="Maximum time to import and load the config in ms (default: 100)")
+    parser.add_argument("--runs", type=int, default=5, help="Runs to take the fastest of (default: 5)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # load_config finds config/config.env in the working directory
+        prompt_path = os.path.join(work_dir, 'prompt.md')
+        open(prompt_path, 'w').close()
+        os.makedirs(os.path.join(work_dir, 'config'))
+        with open(os.path.join(work_dir, 'config', 'config.env'), 'w') as f:
+            f.write(CONFIG.format(prompt_path=prompt_path))
+
+        # The first run also writes bytecode caches, so it is not counted
+        measure(work_dir)
+        results = [measure(work_dir) for _ in range(max(1, args.runs))]
+
+    startup_ms = min(startup_time for startup_time, _, _ in results) / 1000
+    import_ms = min(module_time for _, module_time, _ in results) / 1000
+    modules = results[0][2]
+    deferred = sorted({name.split('.')[0] for name in modules} & set(DEFERRED_MODULES))
+
+    print(f"playlist_transcript_saver starts in {startup_ms:.1f} ms, {import_ms:.1f} ms of it importing "
+          f"(budget {args.budget_ms:.0f} ms, {len(modules)} modules)")
+    failed = False
+    if deferred:
+        print("Imported at startup but should be deferred: " + ', '.join(deferred))
+        failed = True
+    if startup_ms > args.budget_ms:
+        print(f"Startup time is over budget by {startup_ms - args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""Local stand-in for the Claude Messages API.
+
+Point CLAUDE_API_URL at it to exercise the summary path without network
+access or API spend:
+
+    python scripts/mock_claude_server.py --port 8765
+    CLAUDE_API_URL=http://127.0.0.1:8765/v1/messages
+
+Text blocks marked with cache_control are remembered, so the first request
+reports them as cache writes and later requests as cache reads, like the
+real prompt cache. Requests with "stream": true get the response as
+server-sent events. --failure-rate answers that fraction of requests with
+529 overloaded, decided from --seed so reruns fail the same requests.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class MockClaudeHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        if self.path != '/v1/messages':
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        payload = json.loads(body)
+        time.sleep(self.server.latency)
+        if self.server.should_fail(hashlib.sha256(body).hexdigest()):
+            error = json.dumps({'type': 'error', 'error': {'type': 'overloaded_error', 'message': 'Overloaded'}})
+            self.send_response(529)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(error)))
+            self.send_header('retry-after', '0')
+            self.end_headers()
+            self.wfile.write(error.encode('utf-8'))
+            return
+
+        usage = {
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'cache_read_input_tokens': 0,
+            'cache_creation_input_tokens': 0,
+        }
+        for message in payload['messages']:
+            for block in message['content']:
+                tokens = estimate_tokens(block['text'])
+                if 'cache_control' not in block:
+                    usage['input_tokens'] += tokens
+                    continue
+                block_hash = hashlib.sha256(block['text'].encode('utf-8')).hexdigest()
+                with self.server.lock:
+                    cached = block_hash in self.server.cached_blocks
+                    self.server.cached_blocks.add(block_hash)
+                if cached:
+                    usage['cache_read_input_tokens'] += tokens
+                else:
+                    usage['cache_creation_input_tokens'] += tokens
+
+        text = f"# Mock summary\n\nSummarized {usage['input_tokens']} uncached input tokens.\n"
+        usage['output_tokens'] = estimate_tokens(text)
+        if payload.get('stream'):
+            self.send_stream(payload, text, usage)
+            return
+        body = json.dumps({
+            'id': 'msg_mock',
+            'type': 'message',
+            'role': 'assistant',
+            'model': payload['model'],
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'usage': usage,
+        }).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, payload, text, usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        output_tokens = usage.pop('output_tokens')
+        events = [
+            ('message_start', {'type': 'message_start', 'message': {
+                'id': 'msg_mock', 'type': 'message', 'role': 'assistant', 'model': payload['model'],
+                'content': [], 'usage': dict(usage, output_tokens=1)}}),
+            ('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                     'content_block': {'type': 'text', 'text': ''}}),
+        ]
+        for word in text.split(' '):
+            events.append(('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                   'delta': {'type': 'text_delta', 'text': word + ' '}}))
+        events += [
+            ('content_block_stop', {'type': 'content_block_stop', 'index': 0}),
+            ('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn'},
+                               'usage': {'output_tokens': output_tokens}}),
+            ('message_stop', {'type': 'message_stop'}),
+        ]
+        for name, data in events:
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(self.server.token_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, token_delay=0.0, failure_rate=0.0, seed=0):
+    server = ThreadingHTTPServer((host, port), MockClaudeHandler)
+    server.latency = latency
+    server.token_delay = token_delay
+    server.lock = threading.Lock()
+    server.cached_blocks = set()
+    attempts = {}
+
+    def should_fail(key):
+        # Decided per request body and attempt, so concurrent runs fail the same requests
+        with server.lock:
+            attempt = attempts[key] = attempts.get(key, 0) + 1
+        return random.Random(f"{seed}:{key}:{attempt}").random() < failure_rate
+
+    server.should_fail = should_fail
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the Claude Messages API.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed events")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 529")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the injected failures")
+    args = parser.parse_args()
+
+    server = make_server(port=args.port, latency=args.latency, token_delay=args.token_delay,
+                         failure_rate=args.failure_rate, seed=args.seed)
+    print(f"Mock Claude API listening on http://127.0.0.1:{server.server_port}/v1/messages")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
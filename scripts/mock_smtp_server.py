@@ -0,0 +1,108 @@
+"""Local SMTP sink that accepts and discards every message.
+
+Point the mail output at it to exercise delivery without a real server:
+
+    python scripts/mock_smtp_server.py --port 8025
+    SMTP_SERVER=127.0.0.1
+    SMTP_PORT=8025
+    SMTP_PLAINTEXT=true
+
+It does not offer AUTH, so the app skips logging in. --failure-rate
+answers that fraction of messages with a temporary 451 error, decided
+from --seed and the message count so reruns fail the same messages.
+"""
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+
+class MockSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        self.reply("220 localhost mock SMTP sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('ascii', 'replace').strip().split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command in ('HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    size += len(data_line)
+                time.sleep(self.server.latency)
+                if self.server.should_fail():
+                    self.reply("451 Injected temporary failure")
+                else:
+                    self.server.record_message(size)
+                    self.reply("250 OK queued")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class MockSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, latency, failure_rate, seed):
+        super().__init__(address, MockSMTPHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.attempts = 0
+        self.messages = 0
+        self.bytes_received = 0
+
+    def should_fail(self):
+        with self.lock:
+            self.attempts += 1
+            attempt = self.attempts
+        return random.Random(f"{self.seed}:{attempt}").random() < self.failure_rate
+
+    def record_message(self, size):
+        with self.lock:
+            self.messages += 1
+            self.bytes_received += size
+
+    @property
+    def server_port(self):
+        return self.server_address[1]
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, seed=0):
+    return MockSMTPServer((host, port), latency, failure_rate, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local SMTP sink.")
+    parser.add_argument("--port", type=int, default=8025, help="Port to listen on (default: 8025)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before accepting each message")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of messages answered with 451")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the injected failures")
+    args = parser.parse_args()
+
+    server = make_server(port=args.port, latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+    print(f"Mock SMTP sink listening on 127.0.0.1:{server.server_port}")
+    try:
+        server.serve_forever()
+    finally:
+        print(f"Received {server.messages} messages")
+
+
+if __name__ == "__main__":
+    main()
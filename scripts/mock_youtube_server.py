@@ -0,0 +1,244 @@
+"""Local stand-in for the parts of the YouTube Data API the app uses.
+
+Serves a minimal discovery document plus videos, playlists, playlistItems
+and channels list calls over generated data, so the metadata path runs
+without network access or quota:
+
+    python scripts/mock_youtube_server.py --port 8766
+    YOUTUBE_API_ENDPOINT=http://127.0.0.1:8766/
+
+Playlist PLbench-N holds N videos. Titles and descriptions are derived
+from --seed and the video's position, so every run sees the same data.
+Every response carries an ETag and If-None-Match is answered with 304.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PLAYLIST_PREFIX = 'PLbench-'
+CHANNEL_ID = 'UCbench0000000000000000'
+CHANNEL_TITLE = 'Benchmark Channel'
+PAGE_SIZE = 50
+
+WORDS = (
+    'habit energy focus sleep memory learning practice system goal attention '
+    'morning routine reading writing training recovery nutrition balance '
+    'strategy decision mindset progress review feedback skill deep work'
+).split()
+
+
+def playlist_id(size):
+    return f"{PLAYLIST_PREFIX}{size}"
+
+
+def video_id(index):
+    # Real video IDs are 11 characters
+    return f"bv{index:09d}"
+
+
+def video_index(video_id):
+    return int(video_id[2:])
+
+
+def words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def video_snippet(seed, index):
+    rng = random.Random(f"{seed}:video:{index}")
+    return {
+        'title': f"Video {index}: {words(rng, 4).title()}",
+        'description': words(rng, rng.randint(20, 60)),
+        'publishedAt': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00Z",
+        'channelTitle': CHANNEL_TITLE,
+        'channelId': CHANNEL_ID,
+    }
+
+
+def discovery_document(root_url):
+    def list_method(resource, filter_parameter):
+        return {
+            'id': f"youtube.{resource}.list",
+            'path': f"youtube/v3/{resource}",
+            'httpMethod': 'GET',
+            'parameters': {
+                'part': {'type': 'string', 'required': True, 'repeated': True, 'location': 'query'},
+                filter_parameter: {'type': 'string', 'repeated': filter_parameter == 'id', 'location': 'query'},
+                'maxResults': {'type': 'integer', 'location': 'query'},
+                'pageToken': {'type': 'string', 'location': 'query'},
+            },
+            'parameterOrder': ['part'],
+            # Without a response schema the client returns raw bytes instead of parsed JSON
+            'response': {'$ref': 'ListResponse'},
+        }
+
+    return {
+        'kind': 'discovery#restDescription',
+        'discoveryVersion': 'v1',
+        'id': 'youtube:v3',
+        'name': 'youtube',
+        'version': 'v3',
+        'rootUrl': root_url,
+        'servicePath': '',
+        'baseUrl': root_url,
+        'batchPath': 'batch',
+        'parameters': {
+            'key': {'type': 'string', 'location': 'query'},
+            'alt': {'type': 'string', 'default': 'json', 'location': 'query'},
+        },
+        'resources': {
+            'videos': {'methods': {'list': list_method('videos', 'id')}},
+            'playlists': {'methods': {'list': list_method('playlists', 'id')}},
+            'playlistItems': {'methods': {'list': list_method('playlistItems', 'playlistId')}},
+            'channels': {'methods': {'list': list_method('channels', 'id')}},
+        },
+        'schemas': {'ListResponse': {'id': 'ListResponse', 'type': 'object'}},
+    }
+
+
+class MockYouTubeHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        query = {key: values[0] for key, values in urllib.parse.parse_qs(url.query).items()}
+        if url.path == '/discovery/v1/apis/youtube/v3/rest':
+            self.send_json(discovery_document(f"http://{self.server.server_address[0]}:{self.server.server_port}/"))
+            return
+
+        time.sleep(self.server.latency)
+        if self.server.should_fail(self.path):
+            self.send_json({'error': {'code': 503, 'message': 'Injected failure'}}, status=503)
+            return
+
+        if url.path == '/youtube/v3/videos':
+            ids = query.get('id', '').split(',')
+            self.send_list([
+                {'id': video, 'snippet': video_snippet(self.server.seed, video_index(video))}
+                for video in ids if video.startswith('bv')
+            ])
+        elif url.path == '/youtube/v3/playlists':
+            items = []
+            if query.get('id', '').startswith(PLAYLIST_PREFIX):
+                items.append({'id': query['id'], 'snippet': {
+                    'title': f"Benchmark Playlist {query['id'][len(PLAYLIST_PREFIX):]}",
+                    'description': '',
+                    'channelId': CHANNEL_ID,
+                    'channelTitle': CHANNEL_TITLE,
+                }})
+            self.send_list(items)
+        elif url.path == '/youtube/v3/channels':
+            items = []
+            if query.get('id') == CHANNEL_ID:
+                items.append({'id': CHANNEL_ID, 'snippet': {'title': CHANNEL_TITLE, 'description': ''}})
+            self.send_list(items)
+        elif url.path == '/youtube/v3/playlistItems':
+            self.send_playlist_items(query)
+        else:
+            self.send_error(404)
+
+    def send_playlist_items(self, query):
+        playlist = query.get('playlistId', '')
+        if not playlist.startswith(PLAYLIST_PREFIX):
+            self.send_json({'error': {'code': 404, 'message': 'Playlist not found'}}, status=404)
+            return
+        size = int(playlist[len(PLAYLIST_PREFIX):])
+        start = int(query.get('pageToken') or 0)
+        page_size = min(int(query.get('maxResults', 5)), PAGE_SIZE)
+        etag = hashlib.sha256(f"{self.server.seed}:{playlist}:{start}".encode('utf-8')).hexdigest()[:16]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_not_modified(etag)
+            return
+
+        items = []
+        for index in range(start, min(start + page_size, size)):
+            snippet = video_snippet(self.server.seed, index)
+            items.append({
+                'id': f"{playlist}-item-{index}",
+                'snippet': {
+                    'title': snippet['title'],
+                    'description': snippet['description'],
+                    'position': index,
+                    'videoOwnerChannelId': snippet['channelId'],
+                    'videoOwnerChannelTitle': snippet['channelTitle'],
+                },
+                'contentDetails': {'videoId': video_id(index), 'videoPublishedAt': snippet['publishedAt']},
+            })
+        response = self.list_response(items, etag)
+        response['pageInfo']['totalResults'] = size
+        if start + page_size < size:
+            response['nextPageToken'] = str(start + page_size)
+        self.send_json(response, etag=etag)
+
+    def send_list(self, items):
+        response = self.list_response(items)
+        if self.headers.get('If-None-Match') == response['etag']:
+            self.send_not_modified(response['etag'])
+        else:
+            self.send_json(response, etag=response['etag'])
+
+    def send_not_modified(self, etag):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.end_headers()
+
+    def list_response(self, items, etag=None):
+        if etag is None:
+            etag = hashlib.sha256(json.dumps(items, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        return {
+            'kind': 'youtube#listResponse',
+            'etag': etag,
+            'pageInfo': {'totalResults': len(items), 'resultsPerPage': len(items)},
+            'items': items,
+        }
+
+    def send_json(self, data, status=200, etag=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, seed=0):
+    server = ThreadingHTTPServer((host, port), MockYouTubeHandler)
+    server.latency = latency
+    server.seed = seed
+    lock = threading.Lock()
+    attempts = {}
+
+    def should_fail(key):
+        # Decided per request and attempt, so concurrent runs fail the same requests
+        with lock:
+            attempt = attempts[key] = attempts.get(key, 0) + 1
+        return random.Random(f"{seed}:{key}:{attempt}").random() < failure_rate
+
+    server.should_fail = should_fail
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the YouTube Data API.")
+    parser.add_argument("--port", type=int, default=8766, help="Port to listen on (default: 8766)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated data and failures")
+    args = parser.parse_args()
+
+    server = make_server(port=args.port, latency=args.latency, failure_rate=args.failure_rate, seed=args.seed)
+    print(f"Mock YouTube Data API listening on http://127.0.0.1:{server.server_port}/")
+    print(f"Try the playlist https://www.youtube.com/playlist?list={playlist_id(10)}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
 import os
 import re
 import json
+import mmap
+import sqlite3
+import struct
 import subprocess
 from urllib.parse import parse_qs, urlparse
-from googleapiclient.discovery import build
-from youtube_transcript_api import YouTubeTranscriptApi
 import sys
-import requests
-import markdown
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 import hashlib
+import io
 import argparse
-import boto3
+import contextlib
+import random
+import socket
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+# The Google API client, boto3, requests, markdown, the transcript API and
+# the email modules are imported by the functions that use them, so a run
+# only pays for the services it actually calls.
 
 # Configuration variables
 YOUTUBE_API_KEY = ''
@@ -27,10 +34,61 @@ SMTP_USE_TLS = True
 AWS_REGION = ''
 AWS_ACCESS_KEY_ID = ''
 AWS_SECRET_ACCESS_KEY = ''
+SMTP_PLAINTEXT = False
+EMAIL_BATCH_SIZE = 50
+EMAIL_MAX_RETRIES = 3
+TRANSCRIPT_REQUESTS_PER_SECOND = 2.0
+TRANSCRIPT_RETRY_HOURS = 6.0
+NORMALIZE_TRANSCRIPTS = False
+NORMALIZE_PARAGRAPH_SECONDS = 60.0
+TRANSCRIPT_RETRY_MAX_DAYS = 30.0
+CLAUDE_MODEL = 'claude-3-sonnet-20240229'
+CLAUDE_MAX_TOKENS = 4096
+CLAUDE_CACHE_MAX_ENTRIES = 1000
+CLAUDE_CACHE_MAX_AGE_DAYS = 90
+CLAUDE_CONTEXT_TOKENS = 150000
+CLAUDE_CHUNK_TOKENS = 30000
+CLAUDE_API_URL = 'https://api.anthropic.com/v1/messages'
+CLAUDE_PROMPT_CACHING = False
+CLAUDE_CONNECT_TIMEOUT = 10.0
+CLAUDE_READ_TIMEOUT = 300.0
+CLAUDE_MAX_RETRIES = 5
+CLAUDE_MAX_CONCURRENCY = 4
+CLAUDE_INPUT_TOKENS_PER_MINUTE = 0
+YOUTUBE_API_ENDPOINT = ''
+METADATA_MAX_AGE_HOURS = 24.0
+QUEUE_LEASE_SECONDS = 60.0
+QUEUE_MAX_ATTEMPTS = 3
+QUEUE_RETRY_SECONDS = 60.0
+SQLITE_JOURNAL_MODE = 'WAL'
+
+DATA_DIR = 'data'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+WATCH_STATE_PATH = os.path.join(DATA_DIR, 'watch-state.json')
+CLAUDE_CACHE_DIR = os.path.join(DATA_DIR, 'claude-cache')
+QUEUE_PATH = os.path.join(DATA_DIR, 'queue.sqlite3')
+
+VIDEO_SEPARATOR = "\n" + "="*50 + "\n\n"
+# Roughly four characters per token for English text
+CHARS_PER_TOKEN = 4
+TRANSCRIPT_UNAVAILABLE = [{'text': "Transcript unavailable for this video.", 'start': 0, 'duration': 0}]
+MAP_PROMPT = """You are summarizing one part of a longer collection of YouTube video transcripts.
+Another pass will merge your summary with the summaries of the other parts, so do not add an introduction or conclusion.
+For each video in this part, keep its title and write down every key insight, how-to step, strategy, example, resource and notable quote, with the timestamps where they appear.
+Be thorough and specific: anything you leave out will be missing from the final summary."""
 
 def load_config():
     global YOUTUBE_API_KEY, CLAUDE_API_KEY, EMAIL_ADDRESS, EMAIL_PASSWORD, PROMPT_FILE_PATH
     global SMTP_SERVER, SMTP_PORT, SMTP_USE_TLS, AWS_REGION, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
+    global SMTP_PLAINTEXT, EMAIL_BATCH_SIZE, EMAIL_MAX_RETRIES
+    global TRANSCRIPT_REQUESTS_PER_SECOND, TRANSCRIPT_RETRY_HOURS, TRANSCRIPT_RETRY_MAX_DAYS
+    global NORMALIZE_TRANSCRIPTS, NORMALIZE_PARAGRAPH_SECONDS
+    global CLAUDE_MODEL, CLAUDE_MAX_TOKENS
+    global CLAUDE_CACHE_MAX_ENTRIES, CLAUDE_CACHE_MAX_AGE_DAYS, CLAUDE_CONTEXT_TOKENS, CLAUDE_CHUNK_TOKENS
+    global CLAUDE_API_URL, CLAUDE_PROMPT_CACHING, CLAUDE_CONNECT_TIMEOUT, CLAUDE_READ_TIMEOUT
+    global CLAUDE_MAX_RETRIES, CLAUDE_MAX_CONCURRENCY, CLAUDE_INPUT_TOKENS_PER_MINUTE
+    global YOUTUBE_API_ENDPOINT, METADATA_MAX_AGE_HOURS, QUEUE_LEASE_SECONDS, QUEUE_MAX_ATTEMPTS
+    global QUEUE_RETRY_SECONDS, SQLITE_JOURNAL_MODE
    
     # Try to find the config file in multiple locations
     possible_config_paths = [
@@ -79,6 +137,66 @@ def load_config():
                         SMTP_PORT = int(value)
                     elif key == 'SMTP_USE_TLS':
                         SMTP_USE_TLS = value.lower() == 'true'
+                    elif key == 'SMTP_PLAINTEXT':
+                        SMTP_PLAINTEXT = value.lower() == 'true'
+                    elif key == 'AWS_REGION':
+                        AWS_REGION = value
+                    elif key == 'AWS_ACCESS_KEY_ID':
+                        AWS_ACCESS_KEY_ID = value
+                    elif key == 'AWS_SECRET_ACCESS_KEY':
+                        AWS_SECRET_ACCESS_KEY = value
+                    elif key == 'EMAIL_BATCH_SIZE':
+                        EMAIL_BATCH_SIZE = int(value)
+                    elif key == 'EMAIL_MAX_RETRIES':
+                        EMAIL_MAX_RETRIES = int(value)
+                    elif key == 'TRANSCRIPT_REQUESTS_PER_SECOND':
+                        TRANSCRIPT_REQUESTS_PER_SECOND = float(value)
+                    elif key == 'TRANSCRIPT_RETRY_HOURS':
+                        TRANSCRIPT_RETRY_HOURS = float(value)
+                    elif key == 'TRANSCRIPT_RETRY_MAX_DAYS':
+                        TRANSCRIPT_RETRY_MAX_DAYS = float(value)
+                    elif key == 'NORMALIZE_TRANSCRIPTS':
+                        NORMALIZE_TRANSCRIPTS = value.lower() == 'true'
+                    elif key == 'NORMALIZE_PARAGRAPH_SECONDS':
+                        NORMALIZE_PARAGRAPH_SECONDS = float(value)
+                    elif key == 'CLAUDE_MODEL':
+                        CLAUDE_MODEL = value
+                    elif key == 'CLAUDE_MAX_TOKENS':
+                        CLAUDE_MAX_TOKENS = int(value)
+                    elif key == 'CLAUDE_CACHE_MAX_ENTRIES':
+                        CLAUDE_CACHE_MAX_ENTRIES = int(value)
+                    elif key == 'CLAUDE_CACHE_MAX_AGE_DAYS':
+                        CLAUDE_CACHE_MAX_AGE_DAYS = float(value)
+                    elif key == 'CLAUDE_CONTEXT_TOKENS':
+                        CLAUDE_CONTEXT_TOKENS = int(value)
+                    elif key == 'CLAUDE_CHUNK_TOKENS':
+                        CLAUDE_CHUNK_TOKENS = int(value)
+                    elif key == 'CLAUDE_API_URL':
+                        CLAUDE_API_URL = value
+                    elif key == 'CLAUDE_PROMPT_CACHING':
+                        CLAUDE_PROMPT_CACHING = value.lower() == 'true'
+                    elif key == 'CLAUDE_CONNECT_TIMEOUT':
+                        CLAUDE_CONNECT_TIMEOUT = float(value)
+                    elif key == 'CLAUDE_READ_TIMEOUT':
+                        CLAUDE_READ_TIMEOUT = float(value)
+                    elif key == 'CLAUDE_MAX_RETRIES':
+                        CLAUDE_MAX_RETRIES = int(value)
+                    elif key == 'CLAUDE_MAX_CONCURRENCY':
+                        CLAUDE_MAX_CONCURRENCY = int(value)
+                    elif key == 'CLAUDE_INPUT_TOKENS_PER_MINUTE':
+                        CLAUDE_INPUT_TOKENS_PER_MINUTE = int(value)
+                    elif key == 'YOUTUBE_API_ENDPOINT':
+                        YOUTUBE_API_ENDPOINT = value
+                    elif key == 'METADATA_MAX_AGE_HOURS':
+                        METADATA_MAX_AGE_HOURS = float(value)
+                    elif key == 'QUEUE_LEASE_SECONDS':
+                        QUEUE_LEASE_SECONDS = float(value)
+                    elif key == 'QUEUE_MAX_ATTEMPTS':
+                        QUEUE_MAX_ATTEMPTS = int(value)
+                    elif key == 'QUEUE_RETRY_SECONDS':
+                        QUEUE_RETRY_SECONDS = float(value)
+                    elif key == 'SQLITE_JOURNAL_MODE':
+                        SQLITE_JOURNAL_MODE = value.upper()
 
     except IOError as e:
         print(f"Error reading config file: {e}")
@@ -99,61 +217,128 @@ def load_config():
         print(f"Error: The specified PROMPT_FILE_PATH does not exist: {PROMPT_FILE_PATH}")
         sys.exit(1)
 
+    if SQLITE_JOURNAL_MODE not in ('WAL', 'DELETE'):
+        print(f"Error: SQLITE_JOURNAL_MODE must be WAL or DELETE, not {SQLITE_JOURNAL_MODE}")
+        sys.exit(1)
+
     print("Configuration loaded successfully.")
 
-def send_output(output_method, recipient_email, subject, output_file, channel_folder, api):
+def send_output(output_method, recipient_email, subject, output_file, channel_folder, api, chunked=False, workers=1, stream=False, progress=None):
+    # Only console output can show a response while it is being generated
+    console_stream = ConsoleStream() if stream and output_method == 'console' else None
     markdown_content = get_or_update_claude_cache(
         channel_folder, 
         subject,
         output_file,
-        api
+        api,
+        chunked,
+        workers,
+        console_stream
     )
 
     # if not api and no markdown_content, return
     if not api and not markdown_content:
         return
 
+    progress = progress or ItemProgress()
+    progress.mark('summary')
+
     if output_method == 'mail' or output_method == 'ses':
+        import markdown
         html_content = markdown.markdown(markdown_content)
-        if output_method == 'mail':
-            send_email_smtp(recipient_email, subject, html_content)
-        else:  # ses
-            send_email_ses(recipient_email, subject, html_content)
+        email_delivery.enqueue(output_method, recipient_email, subject, html_content,
+                               on_sent=lambda: progress.mark('delivery'))
     elif output_method == 'console':
-        print_console(markdown_content)
+        if console_stream and console_stream.started:
+            console_stream.finish()
+        else:
+            print_console(markdown_content)
+        progress.mark('delivery')
     else:
         print(f"Unsupported output method: {output_method}")
 
-def send_email_smtp(recipient_email, subject, body):
-    msg = MIMEMultipart()
-    msg['From'] = EMAIL_ADDRESS
-    msg['To'] = recipient_email
-    msg['Subject'] = subject
+class EmailDelivery:
+    """Queues outgoing emails and sends them at the end of the run.
 
-    msg.attach(MIMEText(body, 'html'))
+    One authenticated SMTP connection (reopened every EMAIL_BATCH_SIZE
+    messages or after a failure) and one SES client serve every message.
+    """
 
-    try:
-        if SMTP_USE_TLS:
+    def __init__(self):
+        self.queue = []
+        self.smtp_server = None
+        self.smtp_sent = 0
+        self.ses_client = None
+
+    def enqueue(self, output_method, recipient_email, subject, body, on_sent=None):
+        # A comma-separated recipient list fans out to one message per recipient
+        recipients = [recipient.strip() for recipient in (recipient_email or '').split(',') if recipient.strip()]
+        if not recipients:
+            print(f"Error sending email '{subject}': no recipient email address given")
+            return
+        pending = [len(recipients)]
+
+        def on_message_sent():
+            # Report the delivery once every recipient has been sent their copy
+            pending[0] -= 1
+            if pending[0] == 0 and on_sent:
+                on_sent()
+
+        for recipient in recipients:
+            self.queue.append((output_method, recipient, subject, body, on_message_sent))
+
+    def connect_smtp(self):
+        import smtplib
+        if SMTP_PLAINTEXT:
+            server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+        elif SMTP_USE_TLS:
             server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
             server.starttls()
         else:
             server = smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT)
-        
-        server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        print("Email sent successfully via SMTP")
-    except Exception as e:
-        print(f"Error sending email via SMTP: {e}")
+        server.ehlo_or_helo_if_needed()
+        # Local stand-ins usually accept mail without authentication
+        if not SMTP_PLAINTEXT or server.has_extn('auth'):
+            server.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
+        return server
 
-def send_email_ses(recipient_email, subject, body):
-    try:
-        ses_client = boto3.client('ses', 
-                                  region_name=AWS_REGION,
-                                  aws_access_key_id=AWS_ACCESS_KEY_ID,
-                                  aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
+    def close_smtp(self):
+        if self.smtp_server is not None:
+            import smtplib
+            try:
+                self.smtp_server.quit()
+            except smtplib.SMTPException:
+                pass
+            self.smtp_server = None
+            self.smtp_sent = 0
+
+    def send_smtp(self, recipient_email, subject, body):
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        if self.smtp_server is not None and self.smtp_sent >= EMAIL_BATCH_SIZE:
+            self.close_smtp()
+        if self.smtp_server is None:
+            self.smtp_server = self.connect_smtp()
+
+        msg = MIMEMultipart()
+        msg['From'] = EMAIL_ADDRESS
+        msg['To'] = recipient_email
+        msg['Subject'] = subject
+
+        msg.attach(MIMEText(body, 'html'))
+
+        self.smtp_server.send_message(msg)
+        self.smtp_sent += 1
+
+    def send_ses(self, recipient_email, subject, body):
+        if self.ses_client is None:
+            import boto3
+            self.ses_client = boto3.client('ses', 
+                                           region_name=AWS_REGION,
+                                           aws_access_key_id=AWS_ACCESS_KEY_ID,
+                                           aws_secret_access_key=AWS_SECRET_ACCESS_KEY)
         
-        response = ses_client.send_email(
+        self.ses_client.send_email(
             Source=EMAIL_ADDRESS,
             Destination={
                 'ToAddresses': [recipient_email],
@@ -169,15 +354,96 @@ def send_email_ses(recipient_email, subject, body):
                 },
             },
         )
-        print("Email sent successfully via Amazon SES")
-    except Exception as e:
-        print(f"Error sending email via Amazon SES: {e}")
+
+    def flush(self, close=True):
+        latencies = []
+        failed = 0
+        if self.smtp_server is not None and self.queue:
+            # A connection kept open by an earlier flush may have been dropped while idle
+            try:
+                self.smtp_server.noop()
+            except Exception:
+                self.close_smtp()
+        for output_method, recipient_email, subject, body, on_sent in self.queue:
+            service = 'SMTP' if output_method == 'mail' else 'Amazon SES'
+            for attempt in range(EMAIL_MAX_RETRIES + 1):
+                message_start = time.monotonic()
+                try:
+                    with run_trace.span(f'delivery.{output_method}', attempt=attempt):
+                        if output_method == 'mail':
+                            self.send_smtp(recipient_email, subject, body)
+                        else:  # ses
+                            self.send_ses(recipient_email, subject, body)
+                except Exception as e:
+                    # Start over with a fresh connection on the next attempt
+                    self.close_smtp()
+                    if attempt == EMAIL_MAX_RETRIES:
+                        print(f"Error sending email to {recipient_email} via {service}: {e}")
+                        run_trace.count('delivery.failed')
+                        failed += 1
+                        break
+                    delay = get_retry_delay(attempt)
+                    print(f"Error sending email to {recipient_email} via {service} ({e}), retrying in {delay:.1f}s...")
+                    run_trace.count('delivery.retries')
+                    time.sleep(delay)
+                else:
+                    latency = time.monotonic() - message_start
+                    latencies.append(latency)
+                    run_trace.count('delivery.sent')
+                    print(f"Email to {recipient_email} sent successfully via {service} in {latency:.2f}s")
+                    on_sent()
+                    break
+        self.queue = []
+        if close:
+            self.close_smtp()
+
+        if latencies:
+            print(f"Sent {len(latencies)} emails ({failed} failed), "
+                  f"average {sum(latencies) / len(latencies):.2f}s, slowest {max(latencies):.2f}s per message")
+        elif failed:
+            print(f"All {failed} emails failed to send")
+
+email_delivery = EmailDelivery()
 
 def print_console(body):
     print("\n--- Output ---\n")
     print(body)
     print("\n--- End of Output ---\n")
 
+@contextlib.contextmanager
+def open_atomic(path, mode='w'):
+    # Write to a temporary file first so readers, and other workers, never see a partial file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    encoding = None if 'b' in mode else 'utf-8'
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_file_atomic(path, data):
+    with open_atomic(path, 'wb' if isinstance(data, bytes) else 'w') as f:
+        f.write(data)
+
+class ConsoleStream:
+    """Prints streamed response text as it arrives, framed like print_console."""
+
+    def __init__(self):
+        self.started = False
+
+    def __call__(self, text):
+        if not self.started:
+            print("\n--- Output ---\n")
+            self.started = True
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    def finish(self):
+        print("\n\n--- End of Output ---\n")
+
 def slugify(text):
     # Convert to lowercase
     text = text.lower()
@@ -187,130 +453,1068 @@ def slugify(text):
     text = re.sub(r'\s+', '-', text)
     return text
 
+class TraceSpan:
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.trace.record(self.name, self.start, time.perf_counter(), self.args)
+
+# Shared by every span while tracing is off
+NO_SPAN = contextlib.nullcontext()
+
+class RunTrace:
+    """Timed spans and counters for one run, written out as a trace-event file.
+
+    Tracing is off unless --trace is given. span() then returns a shared
+    no-op context manager and count() returns immediately.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.events = []
+        self.counters = {}
+        self.started_at = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self.started_at = time.perf_counter()
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return NO_SPAN
+        return TraceSpan(self, name, args)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name, start, end, args):
+        event = {
+            'name': name,
+            'cat': name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': (start - self.started_at) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+
+    def export(self, path):
+        # Chrome trace-event format, which chrome://tracing and Perfetto can open
+        spans = {}
+        for event in self.events:
+            totals = spans.setdefault(event['name'], {'count': 0, 'total_ms': 0.0})
+            totals['count'] += 1
+            totals['total_ms'] += event['dur'] / 1000
+        end_ts = (time.perf_counter() - self.started_at) * 1e6
+        counter_events = [
+            {'name': name, 'ph': 'C', 'ts': end_ts, 'pid': os.getpid(), 'args': {'value': value}}
+            for name, value in sorted(self.counters.items())
+        ]
+        write_file_atomic(path, json.dumps({
+            'traceEvents': self.events + counter_events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'counters': self.counters, 'spans': spans},
+        }))
+        print(f"Wrote trace with {len(self.events)} spans to {path}")
+
+run_trace = RunTrace()
+
+
+discovery_document = None
+youtube_clients = threading.local()
+
+def load_discovery_document():
+    global discovery_document
+    if discovery_document is None:
+        if YOUTUBE_API_ENDPOINT:
+            # A custom endpoint serves its own discovery document
+            import requests
+            response = requests.get(YOUTUBE_API_ENDPOINT.rstrip('/') + '/discovery/v1/apis/youtube/v3/rest', timeout=30)
+            response.raise_for_status()
+            discovery_document = response.json()
+        else:
+            # google-api-python-client ships the YouTube discovery document, so no fetch is needed
+            from googleapiclient.discovery_cache import get_static_doc
+            discovery_document = json.loads(get_static_doc('youtube', 'v3'))
+    return discovery_document
+
+def get_youtube_client():
+    # httplib2 connections are not thread-safe, so each thread keeps its own
+    # client. Within a thread every call reuses the same keep-alive connection.
+    youtube = getattr(youtube_clients, 'client', None)
+    if youtube is None:
+        import httplib2
+        from googleapiclient.discovery import build_from_document
+        # A custom endpoint points the client at a local stand-in of the API
+        client_options = {'api_endpoint': YOUTUBE_API_ENDPOINT} if YOUTUBE_API_ENDPOINT else None
+        youtube = build_from_document(
+            load_discovery_document(),
+            developerKey=YOUTUBE_API_KEY,
+            http=httplib2.Http(timeout=30),
+            client_options=client_options
+        )
+        youtube_clients.client = youtube
+    return youtube
+
+class MetadataCache:
+    """Video, playlist and channel snippets, memoized for the run and kept in the store.
+
+    Entries younger than METADATA_MAX_AGE_HOURS are used without a request.
+    Older ones are revalidated with If-None-Match, so an unchanged resource
+    costs a 304 instead of a full response. Long-running modes call
+    start_run() for each poll or job, so a run never outlives the age limit.
+    """
+
+    def __init__(self):
+        self.store = None
+        self.memo = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.hits = 0
+        self.revalidated = 0
+        self.fetched = 0
+
+    def start_run(self):
+        with self.lock:
+            self.memo = {}
+            self.started_at = time.time()
+
+    def get(self, kind, resource_id):
+        with self.lock:
+            entry = self.memo.get((kind, resource_id))
+        if entry is None and self.store is not None:
+            entry = self.store.get_metadata(kind, resource_id)
+            if entry is not None:
+                with self.lock:
+                    self.memo[(kind, resource_id)] = entry
+        return entry
+
+    def is_fresh(self, entry):
+        # Anything fetched during this run is reused for the rest of it
+        if entry['fetched_at'] >= self.started_at:
+            return True
+        return time.time() - entry['fetched_at'] < METADATA_MAX_AGE_HOURS * 3600
+
+    def put(self, kind, values, etag=None):
+        # values maps resource IDs to what the lookup returns; None records a missing resource
+        fetched_at = time.time()
+        entries = [(resource_id, {'data': data, 'etag': etag, 'fetched_at': fetched_at})
+                   for resource_id, data in values.items()]
+        with self.lock:
+            self.memo.update(((kind, resource_id), entry) for resource_id, entry in entries)
+        if self.store is not None and entries:
+            self.store.put_metadata(kind, entries)
+
+    def count(self, outcome, value=1):
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + value)
+        run_trace.count(f'cache.metadata_{outcome}', value)
+
+    def print_stats(self):
+        if self.hits + self.revalidated + self.fetched:
+            print(f"Metadata: {self.hits} cached, {self.revalidated} unchanged (304), {self.fetched} fetched")
+
+metadata_cache = MetadataCache()
+
+def get_cached_resource(kind, resource_id, make_request, parse):
+    """Look up one video, playlist or channel through the metadata cache.
+
+    make_request builds the list request for just this resource, and parse
+    turns its first item into the value to return and cache.
+    """
+    entry = metadata_cache.get(kind, resource_id)
+    if entry is not None and metadata_cache.is_fresh(entry):
+        metadata_cache.count('hits')
+        return entry['data']
+
+    from googleapiclient.errors import HttpError
+    request = make_request()
+    if entry is not None and entry['etag']:
+        request.headers['If-None-Match'] = entry['etag']
+    try:
+        response = execute_youtube_request(request, kind)
+    except HttpError as e:
+        if e.resp.status != 304:
+            raise
+        metadata_cache.count('revalidated')
+        metadata_cache.put(kind, {resource_id: entry['data']}, entry['etag'])
+        return entry['data']
+
+    metadata_cache.count('fetched')
+    items = response.get('items', [])
+    data = parse(items[0]) if items else None
+    metadata_cache.put(kind, {resource_id: data}, response.get('etag'))
+    return data
+
+def execute_youtube_request(request, name):
+    # Every list call used here costs one unit of the daily quota, even when answered with 304
+    run_trace.count('youtube.quota_units')
+    with run_trace.span(f'metadata.{name}'):
+        return request.execute()
+
+def build_video_info(video_id, snippet):
+    return {
+        'id': video_id,
+        'title': snippet['title'],
+        'description': snippet['description'],
+        'publishedAt': snippet['publishedAt'],
+        'channelTitle': snippet['channelTitle'],
+        'channelId': snippet['channelId']
+    }
 
 def get_video_info(video_id):
-    youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-    request = youtube.videos().list(
-        part="snippet",
-        id=video_id
+    return get_cached_resource(
+        'videos', video_id,
+        lambda: get_youtube_client().videos().list(part="snippet", id=video_id),
+        lambda item: build_video_info(item['id'], item['snippet'])
     )
-    response = request.execute()
-    if 'items' in response and len(response['items']) > 0:
-        snippet = response['items'][0]['snippet']
-        return {
-            'id': video_id,
-            'title': snippet['title'],
-            'description': snippet['description'],
-            'publishedAt': snippet['publishedAt'],
-            'channelTitle': snippet['channelTitle'],
-            'channelId': snippet['channelId']
-        }
-    return None
+
+def get_videos_info(video_ids):
+    videos_info = {}
+    stale_ids = []
+    for video_id in dict.fromkeys(video_ids):
+        entry = metadata_cache.get('videos', video_id)
+        if entry is not None and metadata_cache.is_fresh(entry):
+            metadata_cache.count('hits')
+            if entry['data']:
+                videos_info[video_id] = entry['data']
+        else:
+            stale_ids.append(video_id)
+    if len(stale_ids) == 1:
+        # A single video can be revalidated with its ETag
+        video_info = get_video_info(stale_ids[0])
+        if video_info:
+            videos_info[stale_ids[0]] = video_info
+        return videos_info
+
+    # Refetching in bulk costs one quota unit per 50 videos, less than revalidating each one.
+    # videos().list accepts up to 50 comma-separated IDs per call
+    youtube = get_youtube_client() if stale_ids else None
+    for i in range(0, len(stale_ids), 50):
+        batch_ids = stale_ids[i:i + 50]
+        request = youtube.videos().list(
+            part="snippet",
+            id=','.join(batch_ids)
+        )
+        response = execute_youtube_request(request, 'videos')
+        fetched = dict.fromkeys(batch_ids)
+        for item in response.get('items', []):
+            fetched[item['id']] = videos_info[item['id']] = build_video_info(item['id'], item['snippet'])
+        # The response ETag covers the whole batch, so it cannot revalidate one video later
+        metadata_cache.put('videos', fetched)
+        metadata_cache.count('fetched', len(batch_ids))
+    return videos_info
 
 def get_playlist_info(playlist_id):
-    youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-    request = youtube.playlists().list(
-        part="snippet",
-        id=playlist_id
+    return get_cached_resource(
+        'playlists', playlist_id,
+        lambda: get_youtube_client().playlists().list(part="snippet", id=playlist_id),
+        lambda item: item['snippet']
     )
-    response = request.execute()
-    if 'items' in response and len(response['items']) > 0:
-        return response['items'][0]['snippet']
-    return None
 
 def get_channel_info(channel_id):
-    youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-    request = youtube.channels().list(
-        part="snippet",
-        id=channel_id
+    return get_cached_resource(
+        'channels', channel_id,
+        lambda: get_youtube_client().channels().list(part="snippet", id=channel_id),
+        lambda item: item['snippet']
     )
-    response = request.execute()
-    if 'items' in response and len(response['items']) > 0:
-        return response['items'][0]['snippet']
-    return None
 
-def get_video_ids_from_playlist(playlist_id):
-    youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+def list_playlist_items(playlist_id, etag=None):
+    """Return every item in the playlist and the first page's ETag.
+
+    When etag matches the first page, the playlist is unchanged and
+    (None, etag) is returned after a single request.
+    """
+    from googleapiclient.errors import HttpError
+    youtube = get_youtube_client()
     
-    video_ids = []
+    items = []
+    first_page_etag = None
     next_page_token = None
     
     while True:
         pl_request = youtube.playlistItems().list(
-            part='contentDetails',
+            part='snippet,contentDetails',
             playlistId=playlist_id,
             maxResults=50,
             pageToken=next_page_token
         )
+        if etag and next_page_token is None:
+            pl_request.headers['If-None-Match'] = etag
         
-        pl_response = pl_request.execute()
+        try:
+            pl_response = execute_youtube_request(pl_request, 'playlistItems')
+        except HttpError as e:
+            if e.resp.status == 304:
+                run_trace.count('youtube.not_modified')
+                return None, etag
+            raise
         
-        for item in pl_response['items']:
-            video_ids.append(item['contentDetails']['videoId'])
+        if first_page_etag is None:
+            # The first page includes the total item count, so its ETag changes when videos are added
+            first_page_etag = pl_response.get('etag')
+        items.extend(pl_response['items'])
         
         next_page_token = pl_response.get('nextPageToken')
         
         if not next_page_token:
             break
     
-    return video_ids
+    return items, first_page_etag
+
+def get_playlist_items_videos_info(items):
+    playlist_videos = []
+    for item in items:
+        video_id = item['contentDetails']['videoId']
+        snippet = item['snippet']
+        # The playlist item snippet describes the playlist entry, so the
+        # video's own channel and publish date live under other keys.
+        # They are missing for private or deleted videos.
+        if 'videoOwnerChannelId' in snippet and 'videoPublishedAt' in item['contentDetails']:
+            video_info = build_video_info(video_id, {
+                'title': snippet['title'],
+                'description': snippet['description'],
+                'publishedAt': item['contentDetails']['videoPublishedAt'],
+                'channelTitle': snippet['videoOwnerChannelTitle'],
+                'channelId': snippet['videoOwnerChannelId']
+            })
+        else:
+            video_info = None
+        playlist_videos.append((video_id, video_info))
+    # Playlist pages are fetched anyway, so remember what they say about each video
+    metadata_cache.put('videos', {video_id: video_info for video_id, video_info in playlist_videos if video_info})
+
+    # Look up whatever the playlist items could not describe in bulk
+    missing_ids = [video_id for video_id, video_info in playlist_videos if video_info is None]
+    if missing_ids:
+        videos_info = get_videos_info(missing_ids)
+        playlist_videos = [
+            (video_id, video_info or videos_info.get(video_id))
+            for video_id, video_info in playlist_videos
+        ]
+
+    return playlist_videos
+
+def get_playlist_videos_info(playlist_id):
+    items, _ = list_playlist_items(playlist_id)
+    return get_playlist_items_videos_info(items)
+
+class HostRateLimiter:
+    """Spaces out requests to the same host, shared by all fetch threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_slot = {}
+        # Time each thread has spent throttled, so callers can separate it from real work
+        self.local = threading.local()
+
+    def min_interval(self):
+        if TRANSCRIPT_REQUESTS_PER_SECOND <= 0:
+            return 0.0
+        return 1.0 / TRANSCRIPT_REQUESTS_PER_SECOND
+
+    def wait(self, host):
+        interval = self.min_interval()
+        if not interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            self.local.waited = getattr(self.local, 'waited', 0.0) + delay
+
+transcript_rate_limiter = HostRateLimiter()
+
+class Transcript:
+    """Transcript segments held as columns rather than one dict per segment.
+
+    Start times and durations are arrays of doubles, and all segment text
+    lives in one UTF-8 buffer, with segment i spanning
+    text[offsets[i]:offsets[i + 1]]. The binary form (header, the three
+    columns, then the text) can be memory-mapped and read in place.
+    """
+
+    HEADER = struct.Struct('<4sIQQ')
+    MAGIC = b'YTTR'
+    VERSION = 1
+
+    def __init__(self, starts, durations, offsets, text, source=None):
+        self.starts = starts
+        self.durations = durations
+        self.offsets = offsets
+        self.text = text
+        # Keeps a memory-mapped file open for as long as the columns point into it
+        self.source = source
+
+    @classmethod
+    def from_segments(cls, segments):
+        starts = array('d')
+        durations = array('d')
+        offsets = array('q', [0])
+        text = bytearray()
+        for segment in segments:
+            starts.append(segment['start'])
+            durations.append(segment['duration'])
+            text += segment['text'].encode('utf-8')
+            offsets.append(len(text))
+        return cls(starts, durations, offsets, bytes(text))
+
+    @classmethod
+    def unavailable(cls):
+        return cls.from_segments(TRANSCRIPT_UNAVAILABLE)
+
+    @classmethod
+    def from_buffer(cls, buffer, source=None):
+        view = memoryview(buffer)
+        magic, version, count, text_size = cls.HEADER.unpack_from(view)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError("Not a transcript file")
+        position = cls.HEADER.size
+        columns = []
+        for typecode, length in (('d', count), ('d', count), ('q', count + 1)):
+            column = view[position:position + length * 8].cast(typecode)
+            if sys.byteorder != 'little':
+                column = array(typecode, column)
+                column.byteswap()
+            columns.append(column)
+            position += length * 8
+        return cls(*columns, view[position:position + text_size], source)
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(mapped, mapped)
+
+    def to_bytes(self):
+        columns = [array('d', self.starts), array('d', self.durations), array('q', self.offsets)]
+        if sys.byteorder != 'little':
+            for column in columns:
+                column.byteswap()
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, len(self), len(self.text))
+        return header + b''.join(column.tobytes() for column in columns) + bytes(self.text)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment_text(self, index):
+        return bytes(self.text[self.offsets[index]:self.offsets[index + 1]]).decode('utf-8')
+
+    def segments(self):
+        for index in range(len(self)):
+            yield self.starts[index], self.durations[index], self.segment_text(index)
+
+    def is_unavailable(self):
+        return len(self) == 1 and self.segment_text(0) == TRANSCRIPT_UNAVAILABLE[0]['text']
+
+class TranscriptUnavailable(Exception):
+    def __init__(self, video_id, error_class):
+        super().__init__(f"Transcript unavailable for video {video_id} ({error_class})")
+        self.error_class = error_class
 
 def get_transcript(video_id):
+    from youtube_transcript_api import YouTubeTranscriptApi
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
+        transcript_rate_limiter.wait('www.youtube.com')
+        with run_trace.span('transcript.api', video_id=video_id):
+            transcript = YouTubeTranscriptApi.get_transcript(video_id)
+        run_trace.count('transcript.api')
         return transcript
     except Exception as e:
         print(f"Error fetching transcript for video {video_id} using YouTube Transcript API: {str(e)}")
         print("Attempting to fetch transcript using 'yt' command...")
+        error_class = type(e).__name__
         
         try:
             video_url = f"https://www.youtube.com/watch?v={video_id}"
-            result = subprocess.run(['yt', '--transcript', video_url], capture_output=True, text=True, check=True)
+            transcript_rate_limiter.wait('www.youtube.com')
+            with run_trace.span('transcript.yt', video_id=video_id):
+                result = subprocess.run(['yt', '--transcript', video_url], capture_output=True, text=True, check=True)
             lines = result.stdout.strip().split('\n')
             transcript = [{'text': line, 'start': i * 5, 'duration': 5} for i, line in enumerate(lines)]
             print(f"Successfully fetched transcript for video {video_id} using 'yt' command.")
+            run_trace.count('transcript.yt')
             return transcript
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
             print(f"Error fetching transcript for video {video_id} using 'yt' command: {str(e)}")
             
-    print(f"Unable to fetch transcript for video {video_id}. Returning placeholder.")
-    return [{'text': "Transcript unavailable for this video.", 'start': 0, 'duration': 0}]
-
-def load_or_create_cache(cache_file):
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_cache(cache_file, cache):
-    with open(cache_file, 'w') as f:
-        json.dump(cache, f)
-
-def get_or_update_cache(cache, video_id, video_info):
-    if video_id not in cache:
-        transcript = get_transcript(video_id)
-        cache[video_id] = {
+    print(f"Unable to fetch transcript for video {video_id}.")
+    run_trace.count('transcript.unavailable')
+    raise TranscriptUnavailable(video_id, error_class)
+
+class TranscriptStore:
+    """Global video metadata and transcript store shared by every channel.
+
+    Metadata is indexed by video_id in SQLite. Transcripts are written once
+    under store/transcripts/ named by the SHA-256 of their content, so the
+    same transcript is never stored twice. Channels only record which
+    video_ids they have used.
+    """
+
+    def __init__(self, store_dir, journal_mode=None):
+        self.transcripts_dir = os.path.join(store_dir, 'transcripts')
+        os.makedirs(self.transcripts_dir, exist_ok=True)
+        # Prefetch threads share the connection, so access is serialized by the lock
+        self.lock = threading.Lock()
+        # Worker processes share the database, so wait for each other's writes rather than failing
+        self.conn = sqlite3.connect(os.path.join(store_dir, 'store.sqlite3'), timeout=30, check_same_thread=False)
+        # Commands that run without the config, like search, keep whatever mode the database is in
+        if journal_mode:
+            self.conn.execute(f'PRAGMA journal_mode={journal_mode}')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS videos ('
+            'video_id TEXT PRIMARY KEY, info TEXT NOT NULL, transcript_hash TEXT NOT NULL)'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS channel_videos ('
+            'channel TEXT NOT NULL, video_id TEXT NOT NULL, PRIMARY KEY (channel, video_id))'
+        )
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS transcript_failures ('
+            'video_id TEXT PRIMARY KEY, error_class TEXT NOT NULL, attempts INTEGER NOT NULL, '
+            'failed_at REAL NOT NULL, retry_at REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS videos_transcript_hash ON videos (transcript_hash)')
+        # Full-text index of transcript paragraphs, plus the rowid range each video occupies
+        try:
+            self.conn.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS search_paragraphs USING fts5('
+                "text, video_id UNINDEXED, title UNINDEXED, start UNINDEXED, tokenize='porter unicode61')"
+            )
+            self.searchable = True
+        except sqlite3.OperationalError:
+            # This SQLite was built without FTS5, so transcripts are stored but not indexed
+            self.searchable = False
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS search_videos ('
+            'video_id TEXT PRIMARY KEY, first_rowid INTEGER NOT NULL, last_rowid INTEGER NOT NULL)'
+        )
+        # Video, playlist and channel snippets from the Data API, with the ETag to revalidate them
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS metadata ('
+            'kind TEXT NOT NULL, resource_id TEXT NOT NULL, data TEXT NOT NULL, etag TEXT, '
+            'fetched_at REAL NOT NULL, PRIMARY KEY (kind, resource_id))'
+        )
+        self.conn.commit()
+        self.migrate_placeholders()
+
+    def migrate_placeholders(self):
+        # Earlier versions stored the unavailable placeholder as the transcript.
+        # Turn those entries into failure records that are due for a retry now.
+        placeholder_hashes = (
+            self.legacy_transcript_hash(TRANSCRIPT_UNAVAILABLE),
+            hashlib.sha256(Transcript.unavailable().to_bytes()).hexdigest()
+        )
+        now = time.time()
+        with self.lock, self.conn:
+            for placeholder_hash in placeholder_hashes:
+                self.conn.execute(
+                    'INSERT OR IGNORE INTO transcript_failures (video_id, error_class, attempts, failed_at, retry_at) '
+                    'SELECT video_id, ?, 1, ?, ? FROM videos WHERE transcript_hash = ?',
+                    ('Unknown', now, now, placeholder_hash)
+                )
+                self.conn.execute('DELETE FROM videos WHERE transcript_hash = ?', (placeholder_hash,))
+
+    def transcript_path(self, transcript_hash, extension='bin'):
+        return os.path.join(self.transcripts_dir, transcript_hash[:2], f"{transcript_hash}.{extension}")
+
+    def legacy_transcript_hash(self, segments):
+        # Transcripts used to be stored as JSON, hashed in this canonical form
+        data = json.dumps(segments, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        return hashlib.sha256(data).hexdigest()
+
+    def put_transcript(self, transcript):
+        data = transcript.to_bytes()
+        transcript_hash = hashlib.sha256(data).hexdigest()
+        path = self.transcript_path(transcript_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_file_atomic(path, data)
+        return transcript_hash
+
+    def get_transcript(self, transcript_hash):
+        path = self.transcript_path(transcript_hash)
+        if os.path.exists(path):
+            return Transcript.open(path)
+        with open(self.transcript_path(transcript_hash, 'json'), 'r', encoding='utf-8') as f:
+            return Transcript.from_segments(json.load(f))
+
+    def contains(self, video_id):
+        with self.lock:
+            row = self.conn.execute('SELECT 1 FROM videos WHERE video_id = ?', (video_id,)).fetchone()
+        return row is not None
+
+    def get(self, video_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT info, transcript_hash FROM videos WHERE video_id = ?', (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'info': json.loads(row[0]), 'transcript': self.get_transcript(row[1])}
+
+    def put(self, video_id, video_data):
+        transcript = video_data['transcript']
+        if not isinstance(transcript, Transcript):
+            transcript = Transcript.from_segments(transcript)
+        transcript_hash = self.put_transcript(transcript)
+        paragraphs = [] if transcript.is_unavailable() or not self.searchable else normalize_transcript(transcript)
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO videos (video_id, info, transcript_hash) VALUES (?, ?, ?)',
+                (video_id, json.dumps(video_data['info']), transcript_hash)
+            )
+            self.conn.execute('DELETE FROM transcript_failures WHERE video_id = ?', (video_id,))
+            self.index_paragraphs(video_id, video_data['info']['title'], paragraphs)
+
+    def index_paragraphs(self, video_id, title, paragraphs):
+        # Callers hold the lock and the transaction
+        if not self.searchable:
+            return
+        row = self.conn.execute(
+            'SELECT first_rowid, last_rowid FROM search_videos WHERE video_id = ?', (video_id,)
+        ).fetchone()
+        if row is not None:
+            self.conn.execute('DELETE FROM search_paragraphs WHERE rowid BETWEEN ? AND ?', row)
+        first_rowid = last_rowid = None
+        for start, text in paragraphs:
+            cursor = self.conn.execute(
+                'INSERT INTO search_paragraphs (text, video_id, title, start) VALUES (?, ?, ?, ?)',
+                (text, video_id, title, start)
+            )
+            first_rowid = first_rowid or cursor.lastrowid
+            last_rowid = cursor.lastrowid
+        if first_rowid is None:
+            first_rowid = last_rowid = 0
+        self.conn.execute(
+            'INSERT OR REPLACE INTO search_videos (video_id, first_rowid, last_rowid) VALUES (?, ?, ?)',
+            (video_id, first_rowid, last_rowid)
+        )
+
+    def reindex(self):
+        # Index videos stored before the search index existed
+        if not self.searchable:
+            return 0
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT video_id, info, transcript_hash FROM videos '
+                'WHERE video_id NOT IN (SELECT video_id FROM search_videos)'
+            ).fetchall()
+        for video_id, info, transcript_hash in rows:
+            transcript = self.get_transcript(transcript_hash)
+            paragraphs = [] if transcript.is_unavailable() else normalize_transcript(transcript)
+            with self.lock, self.conn:
+                self.index_paragraphs(video_id, json.loads(info)['title'], paragraphs)
+        return len(rows)
+
+    def search(self, query, limit):
+        sql = (
+            'SELECT video_id, title, start, snippet(search_paragraphs, 0, \'[\', \']\', \'...\', 16) '
+            'FROM search_paragraphs WHERE search_paragraphs MATCH ? ORDER BY rank LIMIT ?'
+        )
+        with self.lock:
+            try:
+                return self.conn.execute(sql, (query, limit)).fetchall()
+            except sqlite3.OperationalError:
+                # Not valid FTS5 query syntax, so search for the words as plain terms
+                terms = ' '.join('"' + term.replace('"', '""') + '"' for term in query.split())
+                return self.conn.execute(sql, (terms, limit)).fetchall()
+
+    def get_failure(self, video_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT error_class, attempts, failed_at, retry_at FROM transcript_failures WHERE video_id = ?',
+                (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'error_class': row[0], 'attempts': row[1], 'failed_at': row[2], 'retry_at': row[3]}
+
+    def record_failure(self, video_id, error_class):
+        failure = self.get_failure(video_id)
+        attempts = failure['attempts'] + 1 if failure else 1
+        failed_at = time.time()
+        # Check again after TRANSCRIPT_RETRY_HOURS, doubling the wait after every failure
+        retry_delay = min(TRANSCRIPT_RETRY_HOURS * 3600 * 2 ** (attempts - 1), TRANSCRIPT_RETRY_MAX_DAYS * 86400)
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO transcript_failures (video_id, error_class, attempts, failed_at, retry_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (video_id, error_class, attempts, failed_at, failed_at + retry_delay)
+            )
+        return failed_at + retry_delay
+
+    def get_metadata(self, kind, resource_id):
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT data, etag, fetched_at FROM metadata WHERE kind = ? AND resource_id = ?',
+                (kind, resource_id)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'data': json.loads(row[0]), 'etag': row[1], 'fetched_at': row[2]}
+
+    def put_metadata(self, kind, entries):
+        # entries are (resource_id, entry) pairs, written in one transaction
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO metadata (kind, resource_id, data, etag, fetched_at) VALUES (?, ?, ?, ?, ?)',
+                [(kind, resource_id, json.dumps(entry['data']), entry['etag'], entry['fetched_at'])
+                 for resource_id, entry in entries]
+            )
+
+    def add_reference(self, channel, video_id):
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO channel_videos (channel, video_id) VALUES (?, ?)',
+                (channel, video_id)
+            )
+
+    def import_entries(self, channel, entries):
+        for video_id, video_data in entries:
+            if not self.contains(video_id):
+                self.put(video_id, video_data)
+            self.add_reference(channel, video_id)
+        self.migrate_placeholders()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class TranscriptCache:
+    """A channel's view of the global TranscriptStore.
+
+    Videos already stored for any channel are reused; looking one up or
+    storing it records a reference for this channel.
+    """
+
+    def __init__(self, store, channel):
+        self.store = store
+        self.channel = channel
+
+    def __contains__(self, video_id):
+        return self.store.contains(video_id)
+
+    def get(self, video_id):
+        video_data = self.store.get(video_id)
+        if video_data is not None:
+            self.store.add_reference(self.channel, video_id)
+        return video_data
+
+    def __getitem__(self, video_id):
+        video_data = self.get(video_id)
+        if video_data is None:
+            raise KeyError(video_id)
+        return video_data
+
+    def __setitem__(self, video_id, video_data):
+        self.store.put(video_id, video_data)
+        self.store.add_reference(self.channel, video_id)
+
+    def known_unavailable(self, video_id):
+        # A failed transcript is not looked up again until its retry time
+        failure = self.store.get_failure(video_id)
+        return failure is not None and failure['retry_at'] > time.time()
+
+    def record_failure(self, video_id, error_class):
+        return self.store.record_failure(video_id, error_class)
+
+def migrate_channel_cache(store, channel_folder):
+    channel = os.path.basename(channel_folder)
+
+    # One-shot migration from the cache.json files written by earlier versions
+    json_file = os.path.join(channel_folder, 'cache.json')
+    if os.path.exists(json_file):
+        with open(json_file, 'r') as f:
+            entries = json.load(f)
+        store.import_entries(channel, entries.items())
+        os.replace(json_file, json_file + '.migrated')
+        print(f"Migrated {len(entries)} cached videos from {json_file}")
+
+    # ...and from the per-channel SQLite caches that replaced them
+    db_file = os.path.join(channel_folder, 'cache.sqlite3')
+    if os.path.exists(db_file):
+        conn = sqlite3.connect(db_file)
+        rows = conn.execute('SELECT video_id, info, transcript FROM videos').fetchall()
+        conn.close()
+        store.import_entries(channel, (
+            (video_id, {'info': json.loads(info), 'transcript': json.loads(transcript)})
+            for video_id, info, transcript in rows
+        ))
+        os.replace(db_file, db_file + '.migrated')
+        print(f"Migrated {len(rows)} cached videos from {db_file}")
+
+def load_or_create_cache(store, channel_folder):
+    migrate_channel_cache(store, channel_folder)
+    return TranscriptCache(store, os.path.basename(channel_folder))
+
+class TranscriptPrefetcher:
+    """Fetches transcripts for cache misses on a bounded thread pool."""
+
+    def __init__(self, workers):
+        self.workers = max(1, workers)
+        self.futures = {}
+        self.durations = []
+        self.started_at = None
+        self.finished_at = None
+        self.lock = threading.Lock()
+
+    def start(self, cache, video_ids):
+        missing = [
+            video_id for video_id in dict.fromkeys(video_ids)
+            if video_id not in cache and not cache.known_unavailable(video_id)
+        ]
+        if not missing:
+            return
+        self.started_at = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        for video_id in missing:
+            self.futures[video_id] = executor.submit(self.fetch, video_id)
+        # Let the pool drain in the background while the caller writes output
+        executor.shutdown(wait=False)
+
+    def fetch(self, video_id):
+        transcript_rate_limiter.local.waited = 0.0
+        fetch_start = time.monotonic()
+        try:
+            return get_transcript(video_id)
+        finally:
+            fetch_end = time.monotonic()
+            work_time = fetch_end - fetch_start - transcript_rate_limiter.local.waited
+            with self.lock:
+                # A serial run would still be throttled to one request per interval
+                self.durations.append(max(work_time, transcript_rate_limiter.min_interval()))
+                self.finished_at = max(self.finished_at or fetch_end, fetch_end)
+
+    def result(self, video_id):
+        future = self.futures.pop(video_id, None)
+        if future is None:
+            return None
+        return future.result()
+
+    def print_summary(self):
+        if not self.durations:
+            return
+        wall_time = self.finished_at - self.started_at
+        serial_time = sum(self.durations)
+        print(f"Fetched {len(self.durations)} transcripts with {self.workers} workers in {wall_time:.2f}s "
+              f"(serial estimate {serial_time:.2f}s, saved {max(0.0, serial_time - wall_time):.2f}s)")
+
+def get_or_update_cache(cache, video_id, video_info, prefetcher=None):
+    video_data = cache.get(video_id)
+    run_trace.count('cache.transcript_hits' if video_data is not None else 'cache.transcript_misses')
+    if video_data is None:
+        if cache.known_unavailable(video_id):
+            print(f"Skipping transcript for video {video_id}: known to be unavailable")
+            return {'info': video_info, 'transcript': Transcript.unavailable()}
+        try:
+            transcript = prefetcher.result(video_id) if prefetcher else None
+            if transcript is None:
+                transcript = get_transcript(video_id)
+        except TranscriptUnavailable as e:
+            retry_at = cache.record_failure(video_id, e.error_class)
+            print(f"Will check for a transcript for video {video_id} again after "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(retry_at))}")
+            return {'info': video_info, 'transcript': Transcript.unavailable()}
+        video_data = {
             'info': video_info,
-            'transcript': transcript
+            'transcript': Transcript.from_segments(transcript)
         }
-    return cache[video_id]
+        cache[video_id] = video_data
+    return video_data
+
+class ClaudeResponseCache:
+    """Claude responses keyed by a hash of everything that shapes them.
+
+    The key covers the prompt text, model, max_tokens, subject and input
+    content, so changing any of them produces a new entry instead of a
+    stale hit. Entries are evicted by age and, beyond the size limit,
+    least recently used first.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.refresh = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def key(self, prompt, subject, content, mode='single'):
+        material = json.dumps([prompt, CLAUDE_MODEL, CLAUDE_MAX_TOKENS, subject, content, mode])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.md")
+
+    def get(self, key):
+        path = self.path(key)
+        content = None
+        if not self.refresh:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                # Touch the entry so eviction treats it as recently used
+                os.utime(path)
+            except FileNotFoundError:
+                # Missing, or evicted by another worker while it was being read
+                pass
+        if content is None:
+            with self.lock:
+                self.misses += 1
+            run_trace.count('cache.claude_misses')
+            return None
+        with self.lock:
+            self.hits += 1
+        run_trace.count('cache.claude_hits')
+        return content
+
+    def put(self, key, content):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_file_atomic(self.path(key), content)
+
+    def evict(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.md'):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    # Another worker evicted it after the listing
+                    continue
+        entries.sort(reverse=True)
+        oldest_allowed = time.time() - CLAUDE_CACHE_MAX_AGE_DAYS * 86400
+        for index, (mtime, path) in enumerate(entries):
+            if index >= CLAUDE_CACHE_MAX_ENTRIES or mtime < oldest_allowed:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                self.evictions += 1
+
+    def print_stats(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return
+        print(f"Claude response cache: {self.hits} hits, {self.misses} misses "
+              f"({self.hits / lookups:.0%} hit rate), {self.evictions} evicted")
+
+claude_response_cache = ClaudeResponseCache(CLAUDE_CACHE_DIR)
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+def split_into_chunks(content, max_tokens):
+    # Split on video boundaries first, then on lines for anything still too long
+    pieces = []
+    for video_text in content.split(VIDEO_SEPARATOR):
+        if estimate_tokens(video_text) <= max_tokens:
+            pieces.append(video_text)
+            continue
+        piece = ''
+        for line in video_text.splitlines(keepends=True):
+            if piece and estimate_tokens(piece + line) > max_tokens:
+                pieces.append(piece)
+                piece = ''
+            piece += line
+        pieces.append(piece)
+
+    # Pack consecutive pieces greedily, so appending a video to a playlist
+    # only changes the last chunk and the rest stay cached
+    chunks = []
+    chunk = ''
+    for piece in pieces:
+        if not piece.strip():
+            continue
+        candidate = chunk + VIDEO_SEPARATOR + piece if chunk else piece
+        if chunk and estimate_tokens(candidate) > max_tokens:
+            chunks.append(chunk)
+            chunk = piece
+        else:
+            chunk = candidate
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+def summarize_chunk(subject, chunk):
+    key = claude_response_cache.key(MAP_PROMPT, subject, chunk)
+    summary = claude_response_cache.get(key)
+    if summary is None:
+        summary = generate_claude_response(subject, chunk, MAP_PROMPT)
+        claude_response_cache.put(key, summary)
+    return summary
+
+def generate_map_reduce_response(subject, content, prompt, workers, on_text=None):
+    chunks = split_into_chunks(content, CLAUDE_CHUNK_TOKENS)
+    print(f"Summarizing {len(chunks)} chunks for '{subject}'...")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        partials = list(executor.map(lambda chunk: summarize_chunk(subject, chunk), chunks))
+
+    # Merge the partial summaries again if they still do not fit in one request
+    combined = VIDEO_SEPARATOR.join(partials)
+    while estimate_tokens(combined) > CLAUDE_CONTEXT_TOKENS and len(partials) > 1:
+        chunks = split_into_chunks(combined, CLAUDE_CHUNK_TOKENS)
+        if len(chunks) >= len(partials):
+            break
+        print(f"Merging {len(partials)} partial summaries into {len(chunks)}...")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            partials = list(executor.map(lambda chunk: summarize_chunk(subject, chunk), chunks))
+        combined = VIDEO_SEPARATOR.join(partials)
+
+    return generate_claude_response(subject, combined, prompt, on_text)
+
+def get_or_update_claude_cache(cache_dir, subject, file_path, api, chunked=False, workers=1, on_text=None):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    with open(PROMPT_FILE_PATH, 'r', encoding='utf-8') as prompt_file:
+        prompt = prompt_file.read()
 
-def get_or_update_claude_cache(cache_dir, subject, file_path, api):
-    slug = slugify(subject)
-    cache_file = os.path.join(cache_dir, f"{slug}.md")
-    if os.path.exists(cache_file):
+    # The channel folder keeps a readable copy of the latest summary per subject
+    output_file = os.path.join(cache_dir, f"{slugify(subject)}.md")
+    # Summarize in chunks when asked to, or when the input would not fit in one request
+    chunked = chunked or estimate_tokens(prompt + content) > CLAUDE_CONTEXT_TOKENS
+    key = claude_response_cache.key(prompt, subject, content, 'map-reduce' if chunked else 'single')
+    markdown_content = claude_response_cache.get(key)
+    if markdown_content is not None:
         print(f"Using cached Claude response for '{subject}'")
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            return f.read()
+        write_file_atomic(output_file, markdown_content)
+        return markdown_content
 
     # If --api argument is provided, generate response using Claude API
     if api:
         # If not in cache, generate new response from Claude
-        markdown_content = generate_claude_response(subject, file_path)
+        if chunked:
+            markdown_content = generate_map_reduce_response(subject, content, prompt, workers, on_text)
+        else:
+            markdown_content = generate_claude_response(subject, content, prompt, on_text)
         
-        # Update cache with the markdown content
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+        # Update cache with the markdown content. This only happens once the
+        # whole response has arrived, so an interrupted stream caches nothing.
+        claude_response_cache.put(key, markdown_content)
+        write_file_atomic(output_file, markdown_content)
         
         return markdown_content
     else:
@@ -327,29 +1531,172 @@ def copy_to_clipboard(file_path):
     except IOError as e:
         print(f"Error reading file: {e}")
 
-def generate_claude_response(subject, file_path):
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    with open(PROMPT_FILE_PATH, 'r', encoding='utf-8') as prompt_file:
-        prompt = prompt_file.read()
-    
+class ClaudeUsage:
+    """Token usage reported by the Messages API, summed over a run."""
+
+    FIELDS = ['input_tokens', 'output_tokens', 'cache_read_input_tokens', 'cache_creation_input_tokens']
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.totals = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, usage):
+        with self.lock:
+            self.requests += 1
+            for field in self.FIELDS:
+                self.totals[field] += usage.get(field) or 0
+        for field in self.FIELDS:
+            run_trace.count(f'claude.{field}', usage.get(field) or 0)
+
+    def print_summary(self):
+        if not self.requests:
+            return
+        print(f"Claude usage over {self.requests} requests: "
+              f"{self.totals['input_tokens']} input, {self.totals['output_tokens']} output, "
+              f"{self.totals['cache_read_input_tokens']} cache read, "
+              f"{self.totals['cache_creation_input_tokens']} cache write tokens")
+
+claude_usage = ClaudeUsage()
+
+def read_claude_stream(response, on_text):
+    text_parts = []
+    usage = {}
+    completed = False
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith('data:'):
+            continue
+        event = json.loads(line[len('data:'):])
+        if event['type'] == 'message_start':
+            usage.update(event['message'].get('usage', {}))
+        elif event['type'] == 'content_block_delta' and event['delta']['type'] == 'text_delta':
+            text_parts.append(event['delta']['text'])
+            on_text(event['delta']['text'])
+        elif event['type'] == 'message_delta':
+            usage.update(event.get('usage', {}))
+        elif event['type'] == 'message_stop':
+            completed = True
+        elif event['type'] == 'error':
+            raise Exception(f"Claude stream failed: {event['error'].get('message')}")
+    if not completed:
+        raise Exception("Claude stream ended before the response was complete")
+    return ''.join(text_parts), usage
+
+# Rate limits, overload and transient server errors are worth retrying
+CLAUDE_RETRY_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+
+class ClaudeRateLimiter:
+    """Keeps concurrent requests and input tokens per minute under the org's limits."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = None
+        self.available_tokens = None
+        self.refilled_at = time.monotonic()
+
+    def acquire_slot(self):
+        with self.lock:
+            if self.slots is None:
+                self.slots = threading.BoundedSemaphore(max(1, CLAUDE_MAX_CONCURRENCY))
+        self.slots.acquire()
+
+    def release_slot(self):
+        self.slots.release()
+
+    def acquire_tokens(self, tokens):
+        if CLAUDE_INPUT_TOKENS_PER_MINUTE <= 0:
+            return
+        # A request larger than the whole budget waits for a full bucket
+        tokens = min(tokens, CLAUDE_INPUT_TOKENS_PER_MINUTE)
+        refill_rate = CLAUDE_INPUT_TOKENS_PER_MINUTE / 60.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if self.available_tokens is None:
+                    self.available_tokens = CLAUDE_INPUT_TOKENS_PER_MINUTE
+                self.available_tokens = min(
+                    CLAUDE_INPUT_TOKENS_PER_MINUTE,
+                    self.available_tokens + (now - self.refilled_at) * refill_rate
+                )
+                self.refilled_at = now
+                if self.available_tokens >= tokens:
+                    self.available_tokens -= tokens
+                    return
+                delay = (tokens - self.available_tokens) / refill_rate
+            time.sleep(delay)
+
+claude_rate_limiter = ClaudeRateLimiter()
+claude_session = None
+
+def get_claude_session():
+    global claude_session
+    if claude_session is None:
+        import requests
+        claude_session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max(1, CLAUDE_MAX_CONCURRENCY))
+        claude_session.mount('https://', adapter)
+        claude_session.mount('http://', adapter)
+    return claude_session
+
+def get_retry_delay(attempt, response=None):
+    if response is not None:
+        retry_after = response.headers.get('retry-after')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(60.0, 2.0 ** attempt))
+
+def post_claude_request(payload, headers, stream):
+    import requests
+    session = get_claude_session()
+    for attempt in range(CLAUDE_MAX_RETRIES + 1):
+        try:
+            response = session.post(
+                CLAUDE_API_URL,
+                json=payload,
+                headers=headers,
+                stream=stream,
+                timeout=(CLAUDE_CONNECT_TIMEOUT, CLAUDE_READ_TIMEOUT)
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == CLAUDE_MAX_RETRIES:
+                raise
+            delay = get_retry_delay(attempt)
+            print(f"Claude API request failed ({e}), retrying in {delay:.1f}s...")
+        else:
+            if response.status_code not in CLAUDE_RETRY_STATUSES or attempt == CLAUDE_MAX_RETRIES:
+                return response
+            delay = get_retry_delay(attempt, response)
+            response.close()
+            print(f"Claude API returned {response.status_code}, retrying in {delay:.1f}s...")
+        run_trace.count('claude.retries')
+        time.sleep(delay)
+
+def generate_claude_response(subject, content, prompt, on_text=None):
     headers = {
         'Content-Type': 'application/json',
         'x-api-key': CLAUDE_API_KEY,
         'anthropic-version': '2023-06-01'
     }
     
+    prompt_block = {
+        'type': 'text',
+        'text': prompt
+    }
+    if CLAUDE_PROMPT_CACHING:
+        # The prompt is identical on every request, so let the API reuse it as a cached prefix
+        prompt_block['cache_control'] = {'type': 'ephemeral'}
+
     payload = {
-        'model': 'claude-3-sonnet-20240229',
+        'model': CLAUDE_MODEL,
         'messages': [
             {
                 'role': 'user',
                 'content': [
-                    {
-                        'type': 'text',
-                        'text': prompt
-                    },
+                    prompt_block,
                     {
                         'type': 'text',
                         'text': f"Subject: {subject}"
@@ -361,104 +1708,276 @@ def generate_claude_response(subject, file_path):
                 ]
             }
         ],
-        'max_tokens': 4096
+        'max_tokens': CLAUDE_MAX_TOKENS
     }
     
-    response = requests.post('https://api.anthropic.com/v1/messages', json=payload, headers=headers)
-    
-    if response.status_code == 401:
-        raise Exception("Authentication failed. Please check your API key and ensure it's correctly set in the config file.")
-    
-    response.raise_for_status()
-    
-    claude_response = response.json()['content'][0]['text']
+    if on_text:
+        payload['stream'] = True
+
+    claude_rate_limiter.acquire_tokens(estimate_tokens(prompt + content))
+    claude_rate_limiter.acquire_slot()
+    try:
+        with run_trace.span('claude.request', subject=subject, stream=bool(on_text)):
+            request_start = time.monotonic()
+            response = post_claude_request(payload, headers, bool(on_text))
+        
+            if response.status_code == 401:
+                raise Exception("Authentication failed. Please check your API key and ensure it's correctly set in the config file.")
+        
+            response.raise_for_status()
+        
+            if on_text:
+                first_token_at = []
+
+                def on_stream_text(text):
+                    if not first_token_at:
+                        first_token_at.append(time.monotonic())
+                    on_text(text)
+
+                with response:
+                    claude_response, usage = read_claude_stream(response, on_stream_text)
+                total_time = time.monotonic() - request_start
+                time_to_first_token = first_token_at[0] - request_start if first_token_at else total_time
+                print(f"\n\nTime to first token: {time_to_first_token:.2f}s, total: {total_time:.2f}s")
+            else:
+                response_json = response.json()
+                claude_response = response_json['content'][0]['text']
+                usage = response_json.get('usage', {})
+    finally:
+        claude_rate_limiter.release_slot()
+    claude_usage.add(usage)
     
     print(f"Claude's response generated for subject: '{subject}'")
     
     return claude_response
 
 
+class Checkpoint:
+    """Records which stages of each batch item have finished.
+
+    Every finished stage is appended to the checkpoint file as one JSON
+    line, so a killed run loses at most the stage it was in and can resume
+    each item from where it stopped.
+    """
+
+    def __init__(self, checkpoint_file):
+        self.checkpoint_file = checkpoint_file
+        self.lock = threading.Lock()
+        self.items = {}
+        if os.path.exists(checkpoint_file):
+            complete_size = 0
+            with open(checkpoint_file, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # A line cut short by a crash
+                        break
+                    complete_size += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    state = self.items.setdefault(record['item'], {'stages': [], 'data': {}})
+                    if record['stage'] not in state['stages']:
+                        state['stages'].append(record['stage'])
+                    state['data'].update(record['data'])
+            # Drop the torn line, or the next record would be appended to it and lost as well
+            if complete_size < os.path.getsize(checkpoint_file):
+                os.truncate(checkpoint_file, complete_size)
+        self.log = open(checkpoint_file, 'a', encoding='utf-8')
+
+    def item(self, key):
+        state = self.items.setdefault(key, {'stages': [], 'data': {}})
+        return ItemProgress(self, state, key)
+
+    def record(self, key, stage, data):
+        with self.lock:
+            self.log.write(json.dumps({'item': key, 'stage': stage, 'data': data}) + '\n')
+            self.log.flush()
+
+    def close(self):
+        self.log.close()
+
+class ItemProgress:
+    """Stages finished for one video or playlist, saved to its Checkpoint if any."""
+
+    def __init__(self, checkpoint=None, state=None, key=None):
+        self.checkpoint = checkpoint
+        self.key = key
+        self.state = state if state is not None else {'stages': [], 'data': {}}
+        self.data = self.state['data']
+
+    def done(self, stage):
+        return stage in self.state['stages']
+
+    def mark(self, stage, **data):
+        if stage in self.state['stages'] and not data:
+            return
+        if stage not in self.state['stages']:
+            self.state['stages'].append(stage)
+        self.data.update(data)
+        if self.checkpoint:
+            self.checkpoint.record(self.key, stage, data)
+
+    def resumable_text(self):
+        # The text file only needs rebuilding if it never finished or has since been removed
+        return self.done('text') and os.path.exists(self.data.get('output_file', ''))
+
+# Caption annotations such as [Music] and speaker-change markers carry no content
+NON_SPEECH_PATTERN = re.compile(r'\[[^\]]*\]|>>')
+
+def normalize_transcript(transcript):
+    """Merge caption fragments into paragraphs, each with one timestamp.
+
+    Auto-generated captions repeat the end of the previous fragment at the
+    start of the next one; that overlap is dropped. A paragraph ends at the
+    first sentence end after NORMALIZE_PARAGRAPH_SECONDS, or at twice that
+    if no sentence end comes.
+    """
+    paragraphs = []
+    words = []
+    recent_words = []
+    paragraph_start = None
+    for start, duration, text in transcript.segments():
+        fragment = NON_SPEECH_PATTERN.sub(' ', text).split()
+
+        # Find the longest run of words repeated from the end of the previous text.
+        # A single shared word is usually genuine speech unless it is the whole fragment.
+        overlap = 0
+        for size in range(min(len(recent_words), len(fragment)), 0, -1):
+            if size == 1 and len(fragment) > 1:
+                break
+            if [word.lower() for word in recent_words[-size:]] == [word.lower() for word in fragment[:size]]:
+                overlap = size
+                break
+        fragment = fragment[overlap:]
+        if not fragment:
+            continue
+
+        if paragraph_start is None:
+            paragraph_start = start
+        words.extend(fragment)
+        recent_words = (recent_words + fragment)[-20:]
+
+        elapsed = start + duration - paragraph_start
+        if elapsed >= NORMALIZE_PARAGRAPH_SECONDS and (words[-1][-1] in '.?!' or elapsed >= 2 * NORMALIZE_PARAGRAPH_SECONDS):
+            paragraphs.append((paragraph_start, ' '.join(words)))
+            words = []
+            paragraph_start = None
+
+    if words:
+        paragraphs.append((paragraph_start, ' '.join(words)))
+    return paragraphs
+
+def write_video_text(f, video_info, transcript):
+    f.write(f"VIDEO_ID: {video_info['id']}\n")
+    f.write(f"TITLE: {video_info['title']}\n")
+    f.write(f"CHANNEL: {video_info['channelTitle']}\n")
+    f.write(f"PUBLISHED AT: {video_info['publishedAt']}\n")
+    f.write(f"DESCRIPTION: {video_info['description']}\n\n")
+    f.write("TRANSCRIPT:\n\n")
+    if transcript.is_unavailable():
+        f.write(transcript.segment_text(0) + "\n")
+    elif NORMALIZE_TRANSCRIPTS:
+        raw_length = sum(len(f"{start_time:.2f}: {text}\n") for start_time, _, text in transcript.segments())
+        normalized_length = 0
+        for start_time, paragraph in normalize_transcript(transcript):
+            line = f"{int(start_time)}: {paragraph}\n"
+            normalized_length += len(line)
+            f.write(line)
+        print(f"Normalized transcript for '{video_info['title']}': ~{raw_length // CHARS_PER_TOKEN} -> "
+              f"~{normalized_length // CHARS_PER_TOKEN} tokens ({1 - normalized_length / max(raw_length, 1):.0%} fewer)")
+    else:
+        for start_time, _, text in transcript.segments():
+            text = text.replace('\n', ' ')
+            f.write(f"{start_time:.2f}: {text}\n")
+
+def write_playlist_videos_text(f, cache, playlist_videos, prefetcher):
+    for video_id, video_info in playlist_videos:
+        if not video_info:
+            print(f"Could not fetch information for video {video_id}")
+            continue
+
+        video_data = get_or_update_cache(cache, video_id, video_info, prefetcher)
+        with run_trace.span('render.video', video_id=video_id):
+            write_video_text(f, video_info, video_data['transcript'])
+        f.write(VIDEO_SEPARATOR)
+
 def save_transcript_to_text(output_file, video_data):
     video_info = video_data['info']
     transcript = video_data['transcript']
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(f"VIDEO_ID: {video_info['id']}\n")
-        f.write(f"TITLE: {video_info['title']}\n")
-        f.write(f"CHANNEL: {video_info['channelTitle']}\n")
-        f.write(f"PUBLISHED AT: {video_info['publishedAt']}\n")
-        f.write(f"DESCRIPTION: {video_info['description']}\n\n")
-        f.write("TRANSCRIPT:\n\n")
-        if transcript[0]['text'] == "Transcript unavailable for this video.":
-            f.write(transcript[0]['text'] + "\n")
-        else:
-            for entry in transcript:
-                start_time = entry['start']
-                text = entry['text'].replace('\n', ' ')
-                f.write(f"{start_time:.2f}: {text}\n")
+    with open_atomic(output_file) as f, run_trace.span('render.video', video_id=video_info['id']):
+        write_video_text(f, video_info, transcript)
     
     print(f"Saved information for video '{video_info['title']}' to {output_file}")
 
-def process_video(video_id, cache, channel_folder, output_method, recipient_email, subject, api):
-    video_info = get_video_info(video_id)
-    if not video_info:
-        print(f"Could not fetch information for video {video_id}")
-        return
+def process_video(video_id, cache, channel_folder, output_method, recipient_email, subject, api, workers=1, chunked=False, stream=False, progress=None):
+    progress = progress or ItemProgress()
+    if progress.resumable_text():
+        output_file = progress.data['output_file']
+        subject = progress.data['subject']
+    else:
+        video_info = get_video_info(video_id)
+        if not video_info:
+            print(f"Could not fetch information for video {video_id}")
+            return
+        progress.mark('metadata')
 
-    video_data = get_or_update_cache(cache, video_id, video_info)
-    video_slug = slugify(video_info['title'])
-    output_file = os.path.join(channel_folder, f"{video_slug}.txt")
-    save_transcript_to_text(output_file, video_data)
+        video_data = get_or_update_cache(cache, video_id, video_info)
+        progress.mark('transcript')
+        video_slug = slugify(video_info['title'])
+        output_file = os.path.join(channel_folder, f"{video_slug}.txt")
+        save_transcript_to_text(output_file, video_data)
 
-    # Use "LearnThis: [Video Title]" as subject if it's blank
-    if not subject.strip():
-        subject = f"LearnThis: {video_info['title']}"
+        # Use "LearnThis: [Video Title]" as subject if it's blank
+        if not subject.strip():
+            subject = f"LearnThis: {video_info['title']}"
+        progress.mark('text', output_file=output_file, subject=subject)
     
-    send_output(output_method, recipient_email, subject, output_file, channel_folder, api)
+    send_output(output_method, recipient_email, subject, output_file, channel_folder, api, chunked, workers, stream, progress)
 
-def process_playlist(playlist_id, cache, channel_folder, output_method, recipient_email, subject, api):
+def save_playlist_to_text(playlist_id, cache, channel_folder, subject, workers, progress):
     playlist_info = get_playlist_info(playlist_id)
     if not playlist_info:
         print(f"Could not fetch information for playlist {playlist_id}")
-        return
+        return None, subject
 
     playlist_slug = slugify(playlist_info['title'])
     output_file = os.path.join(channel_folder, f"{playlist_slug}.txt")
     
-    video_ids = get_video_ids_from_playlist(playlist_id)
+    playlist_videos = get_playlist_videos_info(playlist_id)
+    progress.mark('metadata')
+
+    # Fetch missing transcripts in the background; the file is still written in playlist order
+    prefetcher = TranscriptPrefetcher(workers)
+    prefetcher.start(cache, [video_id for video_id, video_info in playlist_videos if video_info])
     
-    with open(output_file, 'w', encoding='utf-8') as f:
+    with open_atomic(output_file) as f:
         f.write(f"PLAYLIST: {playlist_info['title']}\n\n")
-        for video_id in video_ids:
-            video_info = get_video_info(video_id)
-            if not video_info:
-                print(f"Could not fetch information for video {video_id}")
-                continue
-
-            video_data = get_or_update_cache(cache, video_id, video_info)
-            f.write(f"VIDEO_ID: {video_info['id']}\n")
-            f.write(f"TITLE: {video_info['title']}\n")
-            f.write(f"CHANNEL: {video_info['channelTitle']}\n")
-            f.write(f"PUBLISHED AT: {video_info['publishedAt']}\n")
-            f.write(f"DESCRIPTION: {video_info['description']}\n\n")
-            f.write("TRANSCRIPT:\n\n")
-            transcript = video_data['transcript']
-            if transcript[0]['text'] == "Transcript unavailable for this video.":
-                f.write(transcript[0]['text'] + "\n")
-            else:
-                for entry in transcript:
-                    start_time = entry['start']
-                    text = entry['text'].replace('\n', ' ')
-                    f.write(f"{start_time:.2f}: {text}\n")
-            f.write("\n" + "="*50 + "\n\n")
+        write_playlist_videos_text(f, cache, playlist_videos, prefetcher)
     
     print(f"Saved information for playlist '{playlist_info['title']}' to {output_file}")
+    prefetcher.print_summary()
+    progress.mark('transcript')
 
     # Use "LearnThis: [Playlist Title]" as subject if it's blank
     if not subject.strip():
         subject = f"LearnThis: {playlist_info['title']}"
+    progress.mark('text', output_file=output_file, subject=subject)
+
+    return output_file, subject
+
+def process_playlist(playlist_id, cache, channel_folder, output_method, recipient_email, subject, api, workers=1, chunked=False, stream=False, progress=None):
+    progress = progress or ItemProgress()
+    if progress.resumable_text():
+        output_file = progress.data['output_file']
+        subject = progress.data['subject']
+    else:
+        output_file, subject = save_playlist_to_text(playlist_id, cache, channel_folder, subject, workers, progress)
+        if not output_file:
+            return
     
-    send_output(output_method, recipient_email, subject, output_file, channel_folder, api)
+    send_output(output_method, recipient_email, subject, output_file, channel_folder, api, chunked, workers, stream, progress)
 
 def copy_to_clipboard(file_path):
     try:
@@ -495,62 +2014,676 @@ def extract_video_id(url):
         return None, playlist_match.group(1)
     return None, None
 
-def main():
-    load_config()
-    
-    parser = argparse.ArgumentParser(description="Process YouTube video or playlist and generate output.")
-    parser.add_argument("--output", choices=['console', 'mail', 'ses'], default='console', help="Output method (default: console)")
-    parser.add_argument("--api", action="store_true", default=False, help="Use API mode")
-    args = parser.parse_args()
-
-    # Prompt for inputs
-    url = input("Enter YouTube video or playlist URL: ")
-    subject = input("Enter subject (optional, press Enter to skip): ")
-    
-    if args.output in ['mail', 'ses']:
-        recipient_email = input("Enter recipient email: ")
-    else:
-        recipient_email = None
-
-    video_id, playlist_id = extract_video_id(url)
-    
+def resolve_channel_folder(video_id, playlist_id):
     if video_id:
         # Single video
         video_info = get_video_info(video_id)
         if not video_info:
             print(f"Could not fetch information for video {video_id}")
-            return 1
+            return None
         channel_info = get_channel_info(video_info['channelId'])
-    elif playlist_id:
+    else:
         # Playlist
         playlist_info = get_playlist_info(playlist_id)
         if not playlist_info:
             print(f"Could not fetch information for playlist {playlist_id}")
-            return 1
+            return None
         channel_info = get_channel_info(playlist_info['channelId'])
-    else:
-        print("Invalid URL. Please provide a valid YouTube video or playlist URL.")
-        return 1
     
     if not channel_info:
         print(f"Could not fetch information for channel")
-        return 1
+        return None
 
     channel_slug = slugify(channel_info['title'])
-    channel_folder = os.path.join('data', channel_slug)
+    channel_folder = os.path.join(DATA_DIR, channel_slug)
     os.makedirs(channel_folder, exist_ok=True)
-    
-    cache_file = os.path.join(channel_folder, 'cache.json')
-    cache = load_or_create_cache(cache_file)
+    return channel_folder
+
+def process_url(url, subject, recipient_email, store, args, progress=None):
+    progress = progress or ItemProgress()
+    video_id, playlist_id = extract_video_id(url)
+    if not video_id and not playlist_id:
+        print("Invalid URL. Please provide a valid YouTube video or playlist URL.")
+        return 1
+
+    channel_folder = progress.data.get('channel_folder')
+    if not channel_folder or not os.path.isdir(channel_folder):
+        channel_folder = resolve_channel_folder(video_id, playlist_id)
+        if not channel_folder:
+            return 1
+        progress.mark('metadata', channel_folder=channel_folder)
+
+    cache = load_or_create_cache(store, channel_folder)
     
     if playlist_id:
-        process_playlist(playlist_id, cache, channel_folder, args.output, recipient_email, subject, args.api)
+        process_playlist(playlist_id, cache, channel_folder, args.output, recipient_email, subject, args.api, args.workers, args.chunked, args.stream, progress)
     else:
-        process_video(video_id, cache, channel_folder, args.output, recipient_email, subject, args.api)
-   
-    save_cache(cache_file, cache)
+        process_video(video_id, cache, channel_folder, args.output, recipient_email, subject, args.api, args.workers, args.chunked, args.stream, progress)
+    return 0
+
+def read_batch_items(batch_file):
+    # One item per line: URL, optionally followed by "| subject" and "| recipient"
+    f = sys.stdin if batch_file == '-' else open(batch_file, 'r', encoding='utf-8')
+    try:
+        items = []
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split('|', 2)]
+            fields += [''] * (3 - len(fields))
+            items.append(tuple(fields))
+        return items
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def run_batch(args, store):
+    items = read_batch_items(args.batch)
+    checkpoint_file = args.checkpoint
+    if not checkpoint_file:
+        if args.batch == '-':
+            checkpoint_file = os.path.join(DATA_DIR, 'batch.checkpoint.jsonl')
+        else:
+            checkpoint_file = f"{args.batch}.checkpoint.jsonl"
+    os.makedirs(os.path.dirname(os.path.abspath(checkpoint_file)), exist_ok=True)
+    checkpoint = Checkpoint(checkpoint_file)
+
+    failed = 0
+    for index, (url, subject, recipient_email) in enumerate(items, 1):
+        progress = checkpoint.item('\t'.join([url, subject, recipient_email]))
+        if progress.done('delivery'):
+            print(f"[{index}/{len(items)}] Already done: {url}")
+            continue
+        print(f"[{index}/{len(items)}] Processing {url}")
+        if args.output in ['mail', 'ses'] and not recipient_email:
+            print(f"No recipient email given for {url}, skipping")
+            failed += 1
+            continue
+        try:
+            if process_url(url, subject, recipient_email or None, store, args, progress):
+                failed += 1
+        except Exception as e:
+            print(f"Error processing {url}: {e}")
+            failed += 1
+
+    # Deliveries are checkpointed as the queued emails go out
+    email_delivery.flush()
+    checkpoint.close()
+
+    print(f"Batch finished: {len(items) - failed} of {len(items)} items processed. Checkpoint: {checkpoint_file}")
+    return 1 if failed else 0
+
+class WatchState:
+    """Per-playlist ETags and already-seen playlist item IDs for --watch."""
+
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self.playlists = {}
+        if os.path.exists(state_file):
+            with open(state_file, 'r', encoding='utf-8') as f:
+                self.playlists = json.load(f)
+
+    def get(self, playlist_id):
+        return self.playlists.setdefault(playlist_id, {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+        write_file_atomic(self.state_file, json.dumps(self.playlists))
+
+def send_new_videos_summary(playlist_state, subject, recipient_email, args, watch_state):
+    delta_file = playlist_state['unsent']
+    if os.path.exists(delta_file):
+        if not subject.strip():
+            subject = f"LearnThis: New in {playlist_state['title']}"
+        send_output(args.output, recipient_email, subject, delta_file, playlist_state['channel_folder'], args.api, args.chunked, args.workers)
+    else:
+        print(f"Summary file {delta_file} no longer exists, not sending it")
+    del playlist_state['unsent']
+    watch_state.save()
+
+def poll_playlist(playlist_id, subject, recipient_email, store, args, watch_state):
+    playlist_state = watch_state.get(playlist_id)
+    if 'unsent' in playlist_state:
+        # An earlier poll saved its new videos but failed to summarize them
+        print(f"Retrying the summary of {playlist_state['unsent']}")
+        send_new_videos_summary(playlist_state, subject, recipient_email, args, watch_state)
+
+    items, etag = list_playlist_items(playlist_id, playlist_state.get('etag'))
+    if items is not None and 'seen' not in playlist_state:
+        # First poll: what is already in the playlist is the starting point
+        playlist_info = get_playlist_info(playlist_id)
+        if not playlist_info:
+            print(f"Could not fetch information for playlist {playlist_id}")
+            return
+        channel_folder = resolve_channel_folder(None, playlist_id)
+        if not channel_folder:
+            return
+        playlist_state.update({
+            'title': playlist_info['title'],
+            'channel_folder': channel_folder,
+            'seen': [item['id'] for item in items],
+            'etag': etag
+        })
+        watch_state.save()
+        print(f"Watching playlist '{playlist_info['title']}' ({len(items)} existing videos)")
+        return
+
+    # Items whose transcript was not available yet are kept until it is
+    pending = playlist_state.get('pending', [])
+    new_items = []
+    if items is not None:
+        listed = {item['id'] for item in items}
+        pending = [item for item in pending if item['id'] in listed]
+        known = set(playlist_state['seen']) | {item['id'] for item in pending}
+        new_items = [item for item in items if item['id'] not in known]
+        playlist_state['etag'] = etag
+
+    channel_folder = playlist_state['channel_folder']
+    os.makedirs(channel_folder, exist_ok=True)
+    cache = load_or_create_cache(store, channel_folder)
+    due_items = [item for item in pending if not cache.known_unavailable(item['contentDetails']['videoId'])]
+    candidates = new_items + due_items
+    if not candidates:
+        playlist_state['pending'] = pending
+        watch_state.save()
+        if items is None:
+            print(f"No changes to playlist {playlist_state['title']}")
+        else:
+            print(f"No new videos in playlist '{playlist_state['title']}'")
+        return
+
+    print(f"Found {len(new_items)} new videos in playlist '{playlist_state['title']}'"
+          + (f", retrying {len(due_items)} waiting for a transcript" if due_items else ""))
+    playlist_videos = get_playlist_items_videos_info(candidates)
+
+    prefetcher = TranscriptPrefetcher(args.workers)
+    prefetcher.start(cache, [video_id for video_id, video_info in playlist_videos if video_info])
+
+    ready_videos = []
+    ready_ids = []
+    waiting_items = [item for item in pending if item not in due_items]
+    for item, (video_id, video_info) in zip(candidates, playlist_videos):
+        if not video_info:
+            print(f"Could not fetch information for video {video_id}")
+            ready_ids.append(item['id'])
+            continue
+        video_data = get_or_update_cache(cache, video_id, video_info, prefetcher)
+        if video_data['transcript'].is_unavailable():
+            waiting_items.append(item)
+        else:
+            ready_videos.append((video_info, video_data['transcript']))
+            ready_ids.append(item['id'])
+    prefetcher.print_summary()
+    playlist_state['pending'] = waiting_items
+    if waiting_items:
+        print(f"{len(waiting_items)} videos in playlist '{playlist_state['title']}' are waiting for a transcript")
+
+    if not ready_videos:
+        playlist_state['seen'].extend(ready_ids)
+        watch_state.save()
+        return
+
+    # Summarize only the ready videos, and append them to the full playlist file
+    new_videos_text = io.StringIO()
+    for video_info, transcript in ready_videos:
+        with run_trace.span('render.video', video_id=video_info['id']):
+            write_video_text(new_videos_text, video_info, transcript)
+        new_videos_text.write(VIDEO_SEPARATOR)
+
+    playlist_slug = slugify(playlist_state['title'])
+    delta_file = os.path.join(channel_folder, f"{playlist_slug}-new-{time.strftime('%Y%m%d-%H%M%S')}.txt")
+    # A retried summary from an earlier poll may have been written in the same second
+    delta_file_base, copy = delta_file[:-len('.txt')], 1
+    while os.path.exists(delta_file):
+        copy += 1
+        delta_file = f"{delta_file_base}-{copy}.txt"
+    with open_atomic(delta_file) as f:
+        f.write(f"PLAYLIST: {playlist_state['title']} (new videos)\n\n")
+        f.write(new_videos_text.getvalue())
+
+    playlist_file = os.path.join(channel_folder, f"{playlist_slug}.txt")
+    # Only a full playlist file saved by an earlier run is extended, so one holding
+    # just the new videos never appears under its name
+    if os.path.exists(playlist_file):
+        with open(playlist_file, 'a', encoding='utf-8') as f:
+            f.write(new_videos_text.getvalue())
+    # Record the appended videos before summarizing, so a failed summary is
+    # retried from the delta file instead of appending them again
+    playlist_state['seen'].extend(ready_ids)
+    playlist_state['unsent'] = delta_file
+    watch_state.save()
+    print(f"Saved {len(ready_videos)} new videos from playlist '{playlist_state['title']}' to {delta_file}")
+
+    send_new_videos_summary(playlist_state, subject, recipient_email, args, watch_state)
+
+def run_watch(args, store):
+    items = read_batch_items(args.watch)
+    watch_state = WatchState(WATCH_STATE_PATH)
+
+    while True:
+        metadata_cache.start_run()
+        for url, subject, recipient_email in items:
+            _, playlist_id = extract_video_id(url)
+            if not playlist_id:
+                print(f"Not a playlist URL, skipping: {url}")
+                continue
+            if args.output in ['mail', 'ses'] and not recipient_email:
+                print(f"No recipient email given for {url}, skipping")
+                continue
+            try:
+                poll_playlist(playlist_id, subject, recipient_email or None, store, args, watch_state)
+            except Exception as e:
+                print(f"Error polling playlist {playlist_id}: {e}")
+        email_delivery.flush()
+
+        if args.once:
+            return 0
+        # main only evicts once the run ends, which a watch loop never does
+        claude_response_cache.evict()
+        print(f"Next poll in {args.interval} seconds")
+        time.sleep(args.interval)
+
+class WorkQueue:
+    """Jobs shared by worker processes through an SQLite database.
+
+    A worker claims a job by taking a lease on it and keeps extending the
+    lease while it works. If the worker dies, the lease runs out and the
+    job is handed to the next worker that asks, resuming from the stages
+    recorded so far. A failed attempt is retried after QUEUE_RETRY_SECONDS,
+    doubling each time, and a job fails for good after QUEUE_MAX_ATTEMPTS
+    claims.
+    """
+
+    def __init__(self, queue_path, journal_mode=None):
+        os.makedirs(os.path.dirname(os.path.abspath(queue_path)), exist_ok=True)
+        # The heartbeat thread shares the connection, so access is serialized by the lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(queue_path, timeout=30, isolation_level=None, check_same_thread=False)
+        # WAL needs shared memory, so workers on other hosts use the rollback journal
+        if journal_mode:
+            self.conn.execute(f'PRAGMA journal_mode={journal_mode}')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id INTEGER PRIMARY KEY, url TEXT NOT NULL, subject TEXT NOT NULL, recipient TEXT NOT NULL, '
+            "status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+            'lease_owner TEXT, lease_expires REAL, progress TEXT, result TEXT, error TEXT, '
+            'enqueued_at REAL NOT NULL, finished_at REAL, not_before REAL NOT NULL DEFAULT 0)'
+        )
+        if 'not_before' not in [row[1] for row in self.conn.execute('PRAGMA table_info(jobs)')]:
+            # Queues created before failed jobs were retried with a delay
+            self.conn.execute('ALTER TABLE jobs ADD COLUMN not_before REAL NOT NULL DEFAULT 0')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)')
+        self.states = {}
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same job
+        with self.lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield
+            except BaseException:
+                self.conn.execute('ROLLBACK')
+                raise
+            self.conn.execute('COMMIT')
+
+    def enqueue(self, items):
+        added = 0
+        now = time.time()
+        with self.transaction():
+            for url, subject, recipient_email in items:
+                # The same item is not queued twice while it is waiting or being worked on
+                queued = self.conn.execute(
+                    "SELECT 1 FROM jobs WHERE url = ? AND subject = ? AND recipient = ? "
+                    "AND status IN ('pending', 'leased')",
+                    (url, subject, recipient_email)
+                ).fetchone()
+                if queued:
+                    continue
+                self.conn.execute(
+                    'INSERT INTO jobs (url, subject, recipient, enqueued_at) VALUES (?, ?, ?, ?)',
+                    (url, subject, recipient_email, now)
+                )
+                added += 1
+        return added
+
+    def claim(self, worker_id):
+        now = time.time()
+        with self.transaction():
+            # Jobs whose workers stopped heartbeating have used up an attempt
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', lease_owner = NULL, finished_at = ?, "
+                "error = 'Lease expired on the last attempt' "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, QUEUE_MAX_ATTEMPTS)
+            )
+            row = self.conn.execute(
+                "SELECT id, url, subject, recipient, progress FROM jobs "
+                "WHERE (status = 'pending' AND not_before <= ?) OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker_id, now + QUEUE_LEASE_SECONDS, row[0])
+            )
+        job_id, url, subject, recipient_email, progress = row
+        return {'id': job_id, 'url': url, 'subject': subject, 'recipient': recipient_email,
+                'progress': json.loads(progress) if progress else {'stages': [], 'data': {}}}
+
+    def item(self, job, worker_id):
+        self.states[job['id']] = (worker_id, job['progress'])
+        return ItemProgress(self, job['progress'], job['id'])
+
+    def record(self, job_id, stage, data):
+        # Called by ItemProgress as stages finish, so a reclaimed job resumes where this one stopped
+        worker_id, state = self.states[job_id]
+        with self.lock:
+            self.conn.execute(
+                'UPDATE jobs SET progress = ? WHERE id = ? AND lease_owner = ?',
+                (json.dumps(state), job_id, worker_id)
+            )
+
+    def heartbeat(self, job_id, worker_id):
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (time.time() + QUEUE_LEASE_SECONDS, job_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result):
+        # Only the current lease holder can finish a job, so a worker that lost its lease cannot
+        # overwrite the result of the one that took over
+        self.states.pop(job_id, None)
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, finished_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (json.dumps(result), time.time(), job_id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """Release a failed job and return its new status, or None if the lease was lost."""
+        self.states.pop(job_id, None)
+        now = time.time()
+        with self.transaction():
+            row = self.conn.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            status = 'pending' if retry and row[0] < QUEUE_MAX_ATTEMPTS else 'failed'
+            # Wait before the next attempt, so a job is not claimed again while the cause persists
+            self.conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, finished_at = ?, not_before = ? '
+                'WHERE id = ?',
+                (status, error, now, now + QUEUE_RETRY_SECONDS * 2 ** (row[0] - 1), job_id)
+            )
+        return status
+
+    def has_unfinished_jobs(self):
+        # Live leases and jobs waiting to be retried are not claimable yet, but will be
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM jobs WHERE (status = 'leased' AND lease_expires >= ?) "
+                "OR (status = 'pending' AND not_before > ?) LIMIT 1", (time.time(), time.time())
+            ).fetchone()
+        return row is not None
+
+    def counts(self):
+        with self.lock:
+            rows = self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class LeaseHeartbeat:
+    """Extends the worker's lease on its current job until the job is finished."""
+
+    def __init__(self, queue, worker_id):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.job_id = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        while not self.stopped.wait(QUEUE_LEASE_SECONDS / 3):
+            job_id = self.job_id
+            if job_id is not None and not self.queue.heartbeat(job_id, self.worker_id):
+                print(f"[{self.worker_id}] Lost the lease on job {job_id}, another worker may take it over")
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+def print_queue_counts(queue):
+    counts = queue.counts()
+    print("Queue: " + ', '.join(f"{counts.get(status, 0)} {status}" for status in ['pending', 'leased', 'done', 'failed']))
+
+def run_enqueue(args):
+    queue = WorkQueue(args.queue)
+    items = read_batch_items(args.file)
+    added = queue.enqueue(items)
+    print(f"Enqueued {added} of {len(items)} items ({len(items) - added} already queued)")
+    print_queue_counts(queue)
+    queue.close()
+    return 0
+
+def run_worker(args, store):
+    queue = WorkQueue(args.queue, SQLITE_JOURNAL_MODE)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    heartbeat = LeaseHeartbeat(queue, worker_id)
+    heartbeat.start()
+
+    processed = failed = 0
+    while True:
+        job = queue.claim(worker_id)
+        if job is None:
+            # Jobs leased by other workers come back if those workers die, and failed jobs after
+            # their retry delay, so wait for them to settle
+            if queue.has_unfinished_jobs():
+                time.sleep(min(5.0, QUEUE_LEASE_SECONDS / 3))
+                continue
+            break
+
+        heartbeat.job_id = job['id']
+        metadata_cache.start_run()
+        print(f"[{worker_id}] Job {job['id']}: {job['url']}")
+        progress = queue.item(job, worker_id)
+        error = None
+        retry = True
+        if progress.done('delivery'):
+            # A worker died between delivering and finishing the job, so there is nothing left to do
+            pass
+        elif args.output in ['mail', 'ses'] and not job['recipient']:
+            error = "No recipient email given"
+            retry = False
+        else:
+            try:
+                if process_url(job['url'], job['subject'], job['recipient'] or None, store, args, progress):
+                    # An invalid URL or a missing video, playlist or channel fails the same way every time
+                    error = "Processing failed"
+                    retry = False
+                else:
+                    # The job is only done once its email has gone out. The connection stays open for the next job
+                    email_delivery.flush(close=False)
+                    if not progress.done('delivery'):
+                        error = "Delivery failed"
+            except Exception as e:
+                error = str(e)
+        heartbeat.job_id = None
+
+        # Each job is counted once, by the worker that finishes it for good
+        if error:
+            status = queue.fail(job['id'], worker_id, error, retry)
+            if status == 'pending':
+                print(f"[{worker_id}] Job {job['id']} failed: {error}. It will be retried")
+            elif status == 'failed':
+                print(f"[{worker_id}] Job {job['id']} failed: {error}")
+                failed += 1
+            else:
+                print(f"[{worker_id}] Job {job['id']} failed after its lease was lost: {error}")
+        elif queue.complete(job['id'], worker_id, {key: progress.data.get(key) for key in ['output_file', 'subject']}):
+            processed += 1
+        else:
+            print(f"[{worker_id}] Job {job['id']} finished after its lease was lost, result discarded")
+
+    heartbeat.stop()
+    email_delivery.close_smtp()
+    print(f"[{worker_id}] Worker finished: {processed} jobs done, {failed} failed")
+    print_queue_counts(queue)
+    queue.close()
+    return 1 if failed else 0
+
+def worker_process(args):
+    # Entry point of each --processes child, which starts from a fresh interpreter
+    if args.trace:
+        run_trace.enable()
+    configure_run(args)
+    store = TranscriptStore(STORE_DIR, SQLITE_JOURNAL_MODE)
+    metadata_cache.store = store
+    exit_code = run_worker(args, store)
+    metadata_cache.print_stats()
+    metadata_cache.store = None
+    store.close()
+    claude_usage.print_summary()
+    if args.trace:
+        run_trace.export(f"{args.trace}.{os.getpid()}")
+    sys.exit(exit_code)
+
+def run_workers(args, store):
+    if args.processes <= 1:
+        return run_worker(args, store)
+
+    import multiprocessing
+    # Spawned rather than forked, so no child inherits another thread's locks
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=worker_process, args=(args,)) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return 1 if any(process.exitcode for process in processes) else 0
+
+def run_search(args):
+    store = TranscriptStore(STORE_DIR)
+    if not store.searchable:
+        store.close()
+        print("Error: search needs SQLite with the FTS5 extension, which this Python's sqlite3 module lacks")
+        return 1
+    if args.reindex:
+        print(f"Indexed {store.reindex()} videos")
+    search_start = time.perf_counter()
+    results = store.search(' '.join(args.query), args.limit)
+    elapsed = time.perf_counter() - search_start
+    store.close()
+
+    for video_id, title, start, snippet in results:
+        start = int(start)
+        timestamp = f"{start // 3600}:{start // 60 % 60:02d}:{start % 60:02d}"
+        print(f"{video_id}  {timestamp}  {title}")
+        print(f"    https://www.youtube.com/watch?v={video_id}&t={start}")
+        print(f"    {snippet}\n")
+    print(f"{len(results)} results in {elapsed * 1000:.1f} ms")
     return 0
 
+def configure_run(args):
+    global NORMALIZE_TRANSCRIPTS
+    with run_trace.span('config.load'):
+        load_config()
+    claude_response_cache.refresh = args.refresh_summary
+    if args.normalize:
+        NORMALIZE_TRANSCRIPTS = True
+
+def main():
+    parser = argparse.ArgumentParser(description="Process YouTube video or playlist and generate output.")
+    parser.add_argument("--output", choices=['console', 'mail', 'ses'], default='console', help="Output method (default: console)")
+    parser.add_argument("--api", action="store_true", default=False, help="Use API mode")
+    parser.add_argument("--workers", type=int, default=4, help="Number of concurrent transcript fetches for playlists (default: 4)")
+    parser.add_argument("--chunked", action="store_true", default=False, help="Summarize in chunks and merge the results (automatic for inputs over CLAUDE_CONTEXT_TOKENS)")
+    parser.add_argument("--stream", action="store_true", default=False, help="Print Claude's response as it is generated (console output only)")
+    parser.add_argument("--normalize", action="store_true", default=False, help="Merge caption fragments into paragraphs to shrink the text sent to Claude")
+    parser.add_argument("--refresh-summary", action="store_true", default=False, help="Ignore cached Claude responses and generate new ones")
+    parser.add_argument("--batch", metavar="FILE", help="Process the URLs listed in FILE ('-' for stdin), one per line as 'URL | subject | recipient'")
+    parser.add_argument("--checkpoint", metavar="FILE", help="Checkpoint file for --batch (default: FILE.checkpoint.jsonl)")
+    parser.add_argument("--watch", metavar="FILE", help="Poll the playlist URLs listed in FILE and summarize only newly added videos")
+    parser.add_argument("--interval", type=int, default=3600, help="Seconds between --watch polls (default: 3600)")
+    parser.add_argument("--once", action="store_true", default=False, help="Poll the --watch playlists once and exit")
+    parser.add_argument("--trace", metavar="FILE", help="Write timings and counters for this run to FILE as trace-event JSON")
+    subparsers = parser.add_subparsers(dest="command")
+    search_parser = subparsers.add_parser("search", help="Search all cached transcripts")
+    search_parser.add_argument("query", nargs="+", help="Words to search for (FTS5 query syntax is accepted)")
+    search_parser.add_argument("--limit", type=int, default=20, help="Maximum number of results (default: 20)")
+    search_parser.add_argument("--reindex", action="store_true", default=False, help="Index cached videos that are not in the search index yet")
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add the URLs listed in a file to the work queue")
+    enqueue_parser.add_argument("file", help="File of URLs in the --batch format ('-' for stdin)")
+    enqueue_parser.add_argument("--queue", default=QUEUE_PATH, help=f"Queue database (default: {QUEUE_PATH})")
+    worker_parser = subparsers.add_parser("worker", help="Process jobs from the work queue until it is empty")
+    worker_parser.add_argument("--processes", type=int, default=1, help="Number of worker processes (default: 1)")
+    worker_parser.add_argument("--queue", default=QUEUE_PATH, help=f"Queue database (default: {QUEUE_PATH})")
+    args = parser.parse_args()
+
+    # Searching only reads the local store, and enqueueing only writes to the queue, so neither needs configuration
+    if args.command == "search":
+        return run_search(args)
+    if args.command == "enqueue":
+        return run_enqueue(args)
+
+    if args.batch and not args.api:
+        parser.error("--batch requires --api")
+    if args.watch and not args.api:
+        parser.error("--watch requires --api")
+    if args.command == "worker" and not args.api:
+        parser.error("worker requires --api")
+
+    if args.trace:
+        run_trace.enable()
+    configure_run(args)
+
+    store = TranscriptStore(STORE_DIR, SQLITE_JOURNAL_MODE)
+    metadata_cache.store = store
+    if args.command == "worker":
+        exit_code = run_workers(args, store)
+    elif args.batch:
+        exit_code = run_batch(args, store)
+    elif args.watch:
+        exit_code = run_watch(args, store)
+    else:
+        # Prompt for inputs
+        url = input("Enter YouTube video or playlist URL: ")
+        subject = input("Enter subject (optional, press Enter to skip): ")
+        
+        if args.output in ['mail', 'ses']:
+            recipient_email = input("Enter recipient email: ")
+        else:
+            recipient_email = None
+
+        exit_code = process_url(url, subject, recipient_email, store, args)
+   
+    metadata_cache.print_stats()
+    metadata_cache.store = None
+    store.close()
+    email_delivery.flush()
+    claude_response_cache.evict()
+    claude_response_cache.print_stats()
+    claude_usage.print_summary()
+    if args.trace:
+        run_trace.export(args.trace)
+    return exit_code
+
 if __name__ == "__main__":
     exit_code = main()
     sys.exit(exit_code)
\ No newline at end of file